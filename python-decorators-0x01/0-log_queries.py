@@ -1,17 +1,117 @@
 #!/usr/bin/env python3
 import sqlite3
 import functools
+import atexit
+import hashlib
+import json
+import queue
+import random
+import sys
+import threading
+import time
 from datetime import datetime
 
 
-# decorator to log SQL queries with timestamp
+# Structured query log written by a background thread: callers only put a
+# small tuple on a bounded queue, and the JSON encoding and the write happen
+# off the request path. When the queue is full, records are dropped and
+# counted instead of blocking the caller.
+class QueryLogger:
+    def __init__(self, stream=None, sample_rate=1.0, max_pending=10000):
+        self.stream = stream or sys.stdout
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._queue = queue.Queue(max_pending)
+        self._writer = threading.Thread(target=self._write_records,
+                                        name="query-log-writer", daemon=True)
+        self._writer.start()
+
+    # Decide whether this call is logged at all
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    # error: name of the exception the query raised, if any
+    def log(self, query, params, duration, rows, error=None):
+        try:
+            self._queue.put_nowait(
+                (time.time(), query, params, duration, rows, error))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _write_records(self):
+        stopping = False
+        while not stopping:
+            record = self._queue.get()
+            if record is None:
+                break
+            lines = [self._format(record)]
+            # drain whatever else is waiting and write it in one go
+            while len(lines) < 512:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True  # stop after writing this batch
+                    break
+                lines.append(self._format(record))
+            self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+    def _format(self, record):
+        logged_at, query, params, duration, rows, error = record
+        return json.dumps({
+            "timestamp": datetime.fromtimestamp(logged_at).isoformat(
+                timespec="milliseconds"),
+            "query": query,
+            "params_hash": params_hash(params),
+            "duration_ms": round(duration * 1000, 3),
+            "rows": rows,
+            "error": error,
+        })
+
+    # Write everything still queued and stop the writer thread
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+
+# Short stable hash of the query parameters, so values are not logged
+def params_hash(params):
+    if params is None:
+        return None
+    return hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+
+
+query_logger = QueryLogger()
+atexit.register(query_logger.close)
+
+
+# decorator to log SQL queries with their duration and row count
 def log_queries(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        if not query_logger.sampled():
+            return func(*args, **kwargs)
         query = kwargs.get("query") if "query" in kwargs else args[0]
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Executing SQL Query: {query}")
-        return func(*args, **kwargs)
+        params = kwargs.get("params") if "params" in kwargs else (
+            args[1] if len(args) > 1 else None)
+        rows, error = None, None
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            if isinstance(result, (list, tuple)):
+                rows = len(result)
+            return result
+        except BaseException as e:
+            error = type(e).__name__  # failing queries are logged too
+            raise
+        finally:
+            query_logger.log(query, params, time.perf_counter() - started,
+                             rows, error)
     return wrapper
 
 
@@ -2,6 +2,8 @@
 import sqlite3
 import functools
 
+from db_pool import with_pooled_connection
+
 
 # decorator to automatically handle DB connection
 def with_db_connection(func):
@@ -23,7 +25,19 @@ def get_user_by_id(conn, user_id):
     return cursor.fetchone()
 
 
+# Same query on a pooled, long-lived connection
+@with_pooled_connection('users.db')
+def get_user_by_id_pooled(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
 if __name__ == "__main__":
     # Fetch user by ID with automatic connection handling
     user = get_user_by_id(user_id=1)
     print(user)
+
+    # Repeated lookups reuse one open connection from the pool
+    for user_id in (1, 2, 1):
+        print(get_user_by_id_pooled(user_id=user_id))
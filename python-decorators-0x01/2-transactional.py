@@ -2,6 +2,8 @@
 import sqlite3
 import functools
 
+from query_cache import query_cache, track_tables
+
 
 # Decorator to automatically handle DB connection
 def with_db_connection(func):
@@ -16,18 +18,22 @@ def with_db_connection(func):
     return wrapper
 
 
-# Decorator to manage transactions (commit/rollback)
+# Decorator to manage transactions (commit/rollback); once a write commits,
+# results cached by cache_query in this process that read a modified table
+# are dropped
 def transactional(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
-        try:
-            result = func(conn, *args, **kwargs)
-            conn.commit()  # commit if no error
-            return result
-        except Exception as e:
-            conn.rollback()  # rollback on error
-            print(f"[ERROR] Transaction failed: {e}")
-            raise
+        with track_tables(conn) as access:
+            try:
+                result = func(conn, *args, **kwargs)
+                conn.commit()  # commit if no error
+            except Exception as e:
+                conn.rollback()  # rollback on error
+                print(f"[ERROR] Transaction failed: {e}")
+                raise
+        query_cache.invalidate_tables(access.written)
+        return result
     return wrapper
 
 
@@ -2,6 +2,8 @@
 import time
 import sqlite3
 import functools
+import random
+import threading
 
 
 # Decorator to automatically handle DB connection
@@ -17,24 +19,156 @@ def with_db_connection(func):
     return wrapper
 
 
-# Decorator to retry a function on failure
-def retry_on_failure(retries=3, delay=2):
+# Errors worth retrying: SQLite lock contention and I/O hiccups, not bad SQL
+# or constraint violations, which fail the same way every time
+TRANSIENT_MESSAGES = ("database is locked", "database table is locked",
+                      "database is busy", "disk i/o error",
+                      "unable to open database file")
+
+
+def is_transient(error):
+    return (isinstance(error, sqlite3.OperationalError)
+            and any(text in str(error).lower() for text in TRANSIENT_MESSAGES))
+
+
+# Process-wide token bucket limiting how many retries may happen per second,
+# so a failing database sees a bounded extra load instead of a retry storm
+class RetryBudget:
+    def __init__(self, rate=5, capacity=20):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def withdraw(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+# Circuit breaker: after failure_threshold consecutive transient failures
+# calls fail fast for reset_timeout seconds, then a single trial call is let
+# through (half-open) to decide whether to close the circuit again
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    # Returns True when this call is the half-open trial; pass that flag
+    # to record_success/record_failure/release_trial for the same call
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Database circuit is open")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError("Database circuit is half-open")
+                self._trial_running = True
+                return True
+            return False
+
+    # Only the trial closes the circuit; other calls that started before
+    # it opened just reset the failure count while it is still closed
+    def record_success(self, trial=False):
+        with self._lock:
+            if trial:
+                self.state = self.CLOSED
+                self._trial_running = False
+            if self.state == self.CLOSED:
+                self._failures = 0
+
+    def record_failure(self, trial=False):
+        with self._lock:
+            if trial:
+                self._trial_running = False
+                self._open()
+            elif self.state == self.CLOSED:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._open()
+
+    # Let another trial through if this one ended without a result, e.g.
+    # on KeyboardInterrupt; safe to call after record_success/failure
+    def release_trial(self, trial):
+        if trial:
+            with self._lock:
+                self._trial_running = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self._failures = 0
+        self._opened_at = time.monotonic()
+
+
+retry_budget = RetryBudget()
+database_breaker = CircuitBreaker()
+
+
+# Exponential backoff with full jitter: a random sleep between 0 and
+# delay * 2 ** (attempt - 1), capped at max_delay
+def backoff(attempt, delay, max_delay):
+    return random.uniform(0, min(max_delay, delay * 2 ** (attempt - 1)))
+
+
+# Decorator to retry a function on transient failures; retries is the total
+# number of attempts and delay the base of the backoff
+def retry_on_failure(retries=3, delay=2, max_delay=30, retry_on=is_transient,
+                     budget=retry_budget, breaker=database_breaker):
+    if isinstance(retry_on, (type, tuple)):
+        exceptions = retry_on
+        retry_on = lambda error: isinstance(error, exceptions)  # noqa: E731
+
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
             for attempt in range(1, retries + 1):
+                # fail fast while the circuit is open
+                trial = breaker.before_call()
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except Exception as e:
-                    last_exception = e
+                    if not retry_on(e):
+                        breaker.record_success(trial)  # database answered
+                        raise
+                    breaker.record_failure(trial)
                     print(f"[WARNING] Attempt {attempt} failed: {e}")
-                    if attempt < retries:
-                        print(f"Retrying in {delay} seconds...")
-                        time.sleep(delay)
-            # If all retries failed, re-raise the last exception
-            print("[ERROR] All retries failed.")
-            raise last_exception
+                    if attempt == retries:
+                        print("[ERROR] All retries failed.")
+                        raise
+                    if breaker.state == breaker.OPEN:
+                        print("[ERROR] Circuit opened, not retrying.")
+                        raise
+                    if not budget.withdraw():
+                        print("[ERROR] Retry budget exhausted.")
+                        raise
+                    wait = backoff(attempt, delay, max_delay)
+                    print(f"Retrying in {wait:.2f} seconds...")
+                    time.sleep(wait)
+                else:
+                    breaker.record_success(trial)
+                    return result
+                finally:
+                    breaker.release_trial(trial)
         return wrapper
     return decorator
 
@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 import sqlite3
 import functools
+import inspect
 
-
-# simple in-memory cache
-query_cache = {}
+from query_cache import freeze, query_cache, track_tables
 
 
 # Decorator to automatically handle DB connection
@@ -22,15 +21,49 @@ def with_db_connection(func):
 
 # Decorator to cache query results
 def cache_query(func):
+    signature = inspect.signature(func)
+
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
-        query = kwargs.get("query") if "query" in kwargs else args[0]
-        if query in query_cache:
+        # key on the query and every other argument, however it was passed
+        bound = signature.bind(conn, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())[1:]  # skip conn
+        if "query" in bound.arguments:
+            query = bound.arguments["query"]
+        else:
+            query = arguments[0][1] if arguments else func.__name__
+        key = freeze(arguments)
+        found, result = query_cache.get(key)
+        if found:
             print(f"[CACHE HIT] Returning cached result for query: {query}")
-            return query_cache[query]
+            return result
         print(f"[CACHE MISS] Executing and caching result for query: {query}")
-        result = func(conn, *args, **kwargs)
-        query_cache[query] = result
+        # a write committed while the query runs makes the result unsafe
+        # to store, see QueryCache.set()
+        since = query_cache.generations()
+        with track_tables(conn) as access:
+            result = func(conn, *args, **kwargs)
+        query_cache.set(key, result, tables=access.read | access.written,
+                        since=since)
+        return result
+    return wrapper
+
+
+# Decorator to manage transactions (commit/rollback); once a write commits,
+# cached results that read any table it modified are dropped
+def transactional(func):
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        with track_tables(conn) as access:
+            try:
+                result = func(conn, *args, **kwargs)
+                conn.commit()  # commit if no error
+            except Exception as e:
+                conn.rollback()  # rollback on error
+                print(f"[ERROR] Transaction failed: {e}")
+                raise
+        query_cache.invalidate_tables(access.written)
         return result
     return wrapper
 
@@ -43,6 +76,13 @@ def fetch_users_with_cache(conn, query):
     return cursor.fetchall()
 
 
+@with_db_connection
+@transactional
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
 if __name__ == "__main__":
     # First call will execute and cache
     users = fetch_users_with_cache(query="SELECT * FROM users")
@@ -51,3 +91,9 @@ if __name__ == "__main__":
     # Second call will fetch from cache
     users_again = fetch_users_with_cache(query="SELECT * FROM users")
     print(users_again)
+
+    # Updating a user invalidates the cached users query
+    update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+    users_fresh = fetch_users_with_cache(query="SELECT * FROM users")
+    print(users_fresh)
+    print(query_cache.stats())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import sqlite3
+import functools
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Thread-safe, bounded pool of long-lived SQLite connections.
+# Keeping connections open keeps SQLite's page cache and statement cache
+# warm across calls; idle connections are health-checked before reuse and
+# replaced once they are older than max_age seconds.
+class ConnectionPool:
+    def __init__(self, database, max_size=5, max_age=600, timeout=10,
+                 check_after=30, **connect_kwargs):
+        self.database = database
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.check_after = check_after
+        self.connect_kwargs = connect_kwargs
+        self._idle = queue.LifoQueue()  # most recently used first
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               **self.connect_kwargs)
+        now = time.monotonic()
+        return conn, now, now
+
+    def _usable(self, conn, created_at, last_used):
+        now = time.monotonic()
+        if now - created_at > self.max_age:
+            return False
+        if now - last_used > self.check_after:
+            try:
+                conn.execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                return False
+        return True
+
+    # Take a connection, waiting up to timeout seconds for a free slot
+    def acquire(self):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free connection to {self.database} "
+                               f"after {self.timeout} seconds")
+        try:
+            while True:
+                try:
+                    entry = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._usable(*entry):
+                    return entry
+                entry[0].close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    # Hand a connection back, rolling back anything left uncommitted
+    def release(self, entry):
+        conn, created_at, _ = entry
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put((conn, created_at, time.monotonic()))
+        except sqlite3.Error:
+            conn.close()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        entry = self.acquire()
+        try:
+            yield entry[0]
+        finally:
+            self.release(entry)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# Shared pool per database file, created on first use
+def get_pool(database, **pool_options):
+    with _pools_lock:
+        if database not in _pools:
+            _pools[database] = ConnectionPool(database, **pool_options)
+        return _pools[database]
+
+
+# Decorator like with_db_connection, but borrowing the connection from a pool
+def with_pooled_connection(database="users.db", **pool_options):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_pool(database, **pool_options).connection() as conn:
+                return func(conn, *args, **kwargs)  # pass connection
+        return wrapper
+    return decorator
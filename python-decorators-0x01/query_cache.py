@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+# Bounded in-memory cache: LRU eviction by entry count and by estimated
+# size in bytes, a time-to-live per entry, and hit/miss/eviction counters
+class QueryCache:
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._by_table = {}  # table -> keys of the entries that read it
+        self._tables = {}  # key -> tables the entry depends on
+        self._generations = {}  # table -> number of invalidations
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) for a live entry, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    # Invalidation counters of every table, to pass to set() as since
+    def generations(self):
+        with self._lock:
+            return dict(self._generations)
+
+    # since: generations() taken before the query ran; if one of its
+    # tables was invalidated meanwhile the result may be stale and is
+    # not stored
+    def set(self, key, value, ttl=None, tables=(), since=None):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if since is not None and any(
+                    self._generations.get(table, 0) != since.get(table, 0)
+                    for table in tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.size_bytes += size
+            self._tables[key] = frozenset(tables)
+            for table in self._tables[key]:
+                self._by_table.setdefault(table, set()).add(key)
+            while (len(self._entries) > self.max_entries
+                   or self.size_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+        for table in self._tables.pop(key):
+            keys = self._by_table[table]
+            keys.discard(key)
+            if not keys:
+                del self._by_table[table]
+
+    # Drop every entry that read one of the given tables
+    def invalidate_tables(self, tables):
+        with self._lock:
+            stale = set()
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                stale.update(self._by_table.get(table, ()))
+            for key in stale:
+                self._remove(key)
+                self.invalidations += 1
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._tables.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[2] >= time.monotonic()
+
+
+# Rough deep size of a query result (lists of row tuples)
+def estimate_size(value):
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v)
+                    for k, v in value.items())
+    return size
+
+
+# Hashable version of query parameters: lists and dicts become tuples,
+# sets frozensets, and anything else unhashable its repr()
+def freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value).__name__, repr(value))
+    return value
+
+
+# Tables read and written by the statements a connection prepares
+class TableAccess:
+    def __init__(self):
+        self.read = set()
+        self.written = set()
+
+
+_WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE,
+                  sqlite3.SQLITE_DELETE)
+_active_trackers = {}  # id(conn) -> TableAccess objects listening on it
+
+
+# Record the tables touched on conn, using SQLite's authorizer hook
+@contextmanager
+def track_tables(conn):
+    access = TableAccess()
+    trackers = _active_trackers.setdefault(id(conn), [])
+    trackers.append(access)
+
+    def authorize(action, table, column, database, source):
+        if table and not table.startswith("sqlite_"):
+            for tracker in trackers:
+                if action == sqlite3.SQLITE_READ:
+                    tracker.read.add(table.lower())
+                elif action in _WRITE_ACTIONS:
+                    tracker.written.add(table.lower())
+        return sqlite3.SQLITE_OK
+
+    # setting an authorizer expires cached statements, so every statement
+    # is prepared (and reported) again while tracked
+    conn.set_authorizer(authorize)
+    try:
+        yield access
+    finally:
+        trackers.remove(access)
+        if not trackers:
+            del _active_trackers[id(conn)]
+            conn.set_authorizer(None)
+
+
+# In-memory cache shared by the decorator modules of this process, so a
+# transactional write anywhere invalidates what cache_query stored
+query_cache = QueryCache()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Unit tests for 3-retry_on_failure.py"""
+
+import io
+import sqlite3
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+retry = __import__("3-retry_on_failure")
+
+LOCKED = sqlite3.OperationalError("database is locked")
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ClockTestCase(unittest.TestCase):
+    """Runs every test with retry.time.monotonic on a FakeClock"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = patch.object(retry.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestCircuitBreaker(ClockTestCase):
+    """Tests for the closed, open and half-open transitions"""
+
+    def open_breaker(self, breaker):
+        """Fail calls until the breaker opens"""
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure(breaker.before_call())
+
+    def test_opens_after_threshold_failures(self):
+        """Consecutive failures open the circuit, which then fails fast"""
+        breaker = retry.CircuitBreaker(failure_threshold=3, reset_timeout=10)
+        for _ in range(2):
+            breaker.record_failure(breaker.before_call())
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        breaker.record_failure(breaker.before_call())
+        self.assertEqual(breaker.state, breaker.OPEN)
+        with self.assertRaises(retry.CircuitOpenError):
+            breaker.before_call()
+
+    def test_success_resets_failure_count(self):
+        """A success while closed starts the failure count over"""
+        breaker = retry.CircuitBreaker(failure_threshold=2)
+        breaker.record_failure(breaker.before_call())
+        breaker.record_success(breaker.before_call())
+        breaker.record_failure(breaker.before_call())
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_half_open_allows_a_single_trial(self):
+        """After reset_timeout exactly one call is let through"""
+        breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        self.open_breaker(breaker)
+        self.clock.now += 10
+        self.assertTrue(breaker.before_call())
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        with self.assertRaises(retry.CircuitOpenError):
+            breaker.before_call()
+
+    def test_trial_success_closes(self):
+        """A successful trial closes the circuit"""
+        breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        self.open_breaker(breaker)
+        self.clock.now += 10
+        breaker.record_success(breaker.before_call())
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        self.assertFalse(breaker.before_call())
+
+    def test_trial_failure_reopens(self):
+        """A failed trial opens the circuit for another reset_timeout"""
+        breaker = retry.CircuitBreaker(failure_threshold=5, reset_timeout=10)
+        self.open_breaker(breaker)
+        self.clock.now += 10
+        breaker.record_failure(breaker.before_call())
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.clock.now += 9
+        with self.assertRaises(retry.CircuitOpenError):
+            breaker.before_call()
+
+    def test_older_call_does_not_end_the_trial(self):
+        """A call started while closed cannot free or settle the trial"""
+        breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        old_call = breaker.before_call()
+        self.assertFalse(old_call)
+        self.open_breaker(breaker)
+        self.clock.now += 10
+        self.assertTrue(breaker.before_call())
+
+        breaker.record_success(old_call)
+        breaker.release_trial(old_call)
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        with self.assertRaises(retry.CircuitOpenError):
+            breaker.before_call()
+
+    def test_release_trial_lets_the_next_trial_through(self):
+        """A trial that ended without a result frees the slot"""
+        breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        self.open_breaker(breaker)
+        self.clock.now += 10
+        breaker.release_trial(breaker.before_call())
+        self.assertTrue(breaker.before_call())
+
+
+class TestRetryBudget(ClockTestCase):
+    """Tests for the retry token bucket"""
+
+    def test_runs_out(self):
+        """Withdrawals fail once the capacity is used up"""
+        budget = retry.RetryBudget(rate=1, capacity=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+    def test_refills_over_time(self):
+        """Tokens come back at rate per second, up to the capacity"""
+        budget = retry.RetryBudget(rate=2, capacity=2)
+        budget.withdraw()
+        budget.withdraw()
+        self.clock.now += 0.5
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        self.clock.now += 100
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+
+class TestBackoff(unittest.TestCase):
+    """Tests for the full jitter backoff"""
+
+    def test_upper_bound_grows_and_is_capped(self):
+        """The sleep is drawn from [0, min(max_delay, delay * 2 ** n)]"""
+        with patch.object(retry.random, "uniform",
+                          side_effect=lambda low, high: high):
+            self.assertEqual(retry.backoff(1, 0.5, 30), 0.5)
+            self.assertEqual(retry.backoff(3, 0.5, 30), 2.0)
+            self.assertEqual(retry.backoff(10, 0.5, 30), 30)
+
+
+class TestRetryOnFailure(ClockTestCase):
+    """Tests for the retry_on_failure decorator"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(retry.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def decorate(self, func, **options):
+        """Wrap func with a fresh breaker and budget"""
+        options.setdefault("breaker", retry.CircuitBreaker())
+        options.setdefault("budget", retry.RetryBudget())
+        return retry.retry_on_failure(delay=0.1, **options)(func)
+
+    def run_quietly(self, func):
+        """Call func, hiding the retry messages"""
+        with redirect_stdout(io.StringIO()):
+            return func()
+
+    def test_retries_transient_errors(self):
+        """A locked database is retried until the call succeeds"""
+        outcomes = [LOCKED, LOCKED, "users"]
+
+        def fetch():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(self.run_quietly(self.decorate(fetch, retries=3)),
+                         "users")
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_does_not_retry_other_errors(self):
+        """Errors rejected by retry_on are raised on the first attempt"""
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            raise sqlite3.OperationalError("no such table: users")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            self.run_quietly(self.decorate(fetch, retries=5))
+        self.assertEqual(len(calls), 1)
+
+    def test_stops_when_budget_runs_out(self):
+        """No retry is made without a token in the budget"""
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            raise LOCKED
+
+        budget = retry.RetryBudget(rate=0, capacity=1)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.run_quietly(self.decorate(fetch, retries=5, budget=budget))
+        self.assertEqual(len(calls), 2)
+
+    def test_interrupted_trial_is_released(self):
+        """KeyboardInterrupt during the trial does not wedge the breaker"""
+        breaker = retry.CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record_failure(breaker.before_call())
+        self.clock.now += 10
+
+        def interrupted():
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.decorate(interrupted, breaker=breaker)()
+        self.assertEqual(self.decorate(lambda: "users", breaker=breaker)(),
+                         "users")
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,15 +5,27 @@ Stream users one by one from the user_data table using a generator.
 
 import mysql.connector
 
+from rows import row_factory
 
-def stream_users():
+
+def stream_users(unbuffered=False, read_ahead=500, row_type="dict"):
     """
     Generator that streams rows from the user_data table one by one.
 
+    Args:
+        unbuffered (bool): Read rows from the server as they are consumed
+            instead of letting the driver buffer the whole result set.
+            Memory stays flat and the first row arrives immediately.
+        read_ahead (int): Rows fetched per round trip in unbuffered mode.
+        row_type (str): "dict", or "tuple"/"record" for plain tuples or
+            rows.UserRow records, which skip the per-row dict.
+
     Yields:
         dict: A row from the user_data table with keys:
               user_id, name, email, age
     """
+    make_row = row_factory(row_type)
+    dictionary = row_type == "dict"
     connection = None
     cursor = None
     try:
@@ -23,18 +35,32 @@ def stream_users():
             password="root",    # adjust if needed
             database="ALX_prodev"
         )
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
+        if not unbuffered:
+            cursor = connection.cursor(dictionary=dictionary)
+            cursor.execute("SELECT user_id, name, email, age FROM user_data")
 
-        # one loop only → generator handles streaming
-        for row in cursor:
-            yield row
+            # one loop only → generator handles streaming
+            for row in cursor if make_row is None else map(make_row, cursor):
+                yield row
+            return
+
+        cursor = connection.cursor(dictionary=dictionary, buffered=False)
+        cursor.execute("SELECT user_id, name, email, age FROM user_data")
+        rows = cursor.fetchmany(read_ahead)
+        while rows:
+            yield from rows if make_row is None else map(make_row, rows)
+            rows = cursor.fetchmany(read_ahead)
 
     except mysql.connector.Error as err:
         print(f"Error: {err}")
         return
     finally:
         if cursor:
-            cursor.close()
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                # an unbuffered cursor closed early still has unread rows;
+                # closing the connection below discards them
+                pass
         if connection:
             connection.close()
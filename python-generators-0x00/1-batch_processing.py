@@ -3,18 +3,35 @@
 Batch processing of users using Python generators.
 """
 
+import os
+import time
+from array import array
+
 import mysql.connector
 
+from predicates import build_select, col
+from seed import USER_COLUMNS
+
 
-def stream_users_in_batches(batch_size):
+def stream_users_in_batches(batch_size, columnar=False, where=None,
+                            columns=None, order_by=None, raise_errors=False):
     """
     Generator that fetches rows from user_data in batches.
 
     Args:
         batch_size (int): Number of rows per batch.
+        columnar (bool): Yield each batch as one dict of columns instead
+            of one dict per row, see columns_from_rows().
+        where (Predicate): Filter evaluated by the database, built with
+            predicates.col(), so only matching rows are sent over.
+        columns (list[str]): Columns to select, all of them when None.
+        order_by (list[str]): Columns to sort the rows by.
+        raise_errors (bool): Let database errors propagate instead of
+            printing them and ending the stream as if it were complete.
 
     Yields:
-        list[dict]: A batch of rows as dictionaries.
+        list[dict]: A batch of rows as dictionaries, or a dict of
+        columns when columnar is True.
     """
     connection = None
     cursor = None
@@ -25,8 +42,18 @@ def stream_users_in_batches(batch_size):
             password="root",   # adjust if needed
             database="ALX_prodev"
         )
+        query, params = build_select(columns, where, order_by)
+        if columnar:
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                yield columns_from_rows(rows, columns)
+                rows = cursor.fetchmany(batch_size)
+            return
+
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT user_id, name, email, age FROM user_data")
+        cursor.execute(query, params)
 
         batch = []
         for row in cursor:  # loop #1
@@ -38,23 +65,231 @@ def stream_users_in_batches(batch_size):
             yield batch
 
     except mysql.connector.Error as err:
+        if raise_errors:
+            raise
         print(f"Error: {err}")
         return
     finally:
         if cursor:
-            cursor.close()
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass  # already failing; the connection is closed below
         if connection:
             connection.close()
 
 
-def batch_processing(batch_size):
+def stream_users_adaptive(min_size=100, max_size=10000,
+                          target_seconds=0.05, max_bytes=None, where=None):
+    """
+    Generator that fetches batches sized to a target latency and memory.
+
+    Every batch is timed and its size in bytes estimated; the next batch
+    grows or shrinks (at most 2x per step) toward target_seconds of fetch
+    time within [min_size, max_size]. With max_bytes, each batch is then
+    capped, even below min_size, to the rows that fit in max_bytes at
+    the average row size of the previous batch; the first row is read on
+    its own to size the first batch. Rows larger than average can still
+    take a batch slightly over the budget.
+
+    Args:
+        min_size (int): Smallest batch, also the first one.
+        max_size (int): Largest batch.
+        target_seconds (float): Fetch time to aim for per batch.
+        max_bytes (int): Memory budget per batch, None for no limit.
+        where (Predicate): Filter evaluated by the database.
+
+    Yields:
+        list[dict]: A batch of rows as dictionaries.
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = mysql.connector.connect(
+            host="localhost",
+            user="root",       # adjust if needed
+            password="root",   # adjust if needed
+            database="ALX_prodev"
+        )
+        # unbuffered, so every fetchmany() pays its own network time
+        cursor = connection.cursor(dictionary=True, buffered=False)
+        query, params = build_select(where=where)
+        cursor.execute(query, params)
+        size = min_size
+        first = []
+        if max_bytes:
+            first = cursor.fetchmany(1)
+            if first:
+                size = max(1, min(size, max_bytes // row_bytes(first[0])))
+        while True:
+            started = time.perf_counter()
+            batch = first
+            if size > len(first):
+                batch = first + cursor.fetchmany(size - len(first))
+            first = []
+            elapsed = time.perf_counter() - started
+            if not batch:
+                break
+            yield batch
+            size = adapt_batch_size(
+                size, elapsed, sum(map(row_bytes, batch)),
+                min_size, max_size, target_seconds, max_bytes,
+            )
+
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        return
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass  # unread rows are dropped with the connection
+        if connection:
+            connection.close()
+
+
+def adapt_batch_size(size, elapsed, size_bytes, min_size, max_size,
+                     target_seconds, max_bytes=None):
+    """
+    Pick the next batch size from how the last batch performed.
+
+    Args:
+        size (int): Rows requested for the last batch.
+        elapsed (float): Seconds it took to fetch.
+        size_bytes (int): Estimated bytes it held.
+        min_size, max_size (int): Bounds of the batch size.
+        target_seconds (float): Fetch time to aim for.
+        max_bytes (int): Memory budget per batch, None for no limit.
+            Applied last, so it can take the size below min_size.
+
+    Returns:
+        int: Rows to request next.
+    """
+    factor = target_seconds / elapsed if elapsed > 0 else 2.0
+    factor = min(max(factor, 0.5), 2.0)
+    next_size = int(min(max(size * factor, min_size), max_size))
+    if max_bytes and size_bytes:
+        next_size = min(next_size, int(size * max_bytes / size_bytes))
+    return max(next_size, 1)
+
+
+def row_bytes(row):
+    """Rough payload size of a row: text length plus 8 bytes per number"""
+    return sum(len(value) if isinstance(value, str) else 8
+               for value in row.values())
+
+
+def columns_from_rows(rows, columns=None):
+    """
+    Transpose row tuples into a columnar batch.
+
+    Ages are packed into a signed 64-bit array, which supports the buffer
+    protocol, so numpy.frombuffer(batch["age"], dtype="int64") can wrap
+    it without a copy for vectorised work.
+
+    Args:
+        rows (list[tuple]): Rows with one value per selected column.
+        columns (list[str]): Names of the selected columns, all of the
+            user_data columns in table order when None.
+
+    Returns:
+        dict: Column name mapped to its values for the batch.
+    """
+    batch = {}
+    for name, values in zip(columns or USER_COLUMNS, zip(*rows)):
+        if name == "age":
+            batch[name] = array("q", map(int, values))
+        else:
+            batch[name] = list(values)
+    return batch
+
+
+def batch_processing(batch_size, columnar=False):
     """
     Processes users in batches and filters users over the age of 25.
 
     Args:
         batch_size (int): Number of rows per batch.
+        columnar (bool): Read columnar batches and only build a row dict
+            when printing it.
     """
-    for batch in stream_users_in_batches(batch_size):  # loop #2
+    # the age filter runs in the database, only matching rows come back
+    over_25 = col("age") > 25
+    if columnar:
+        for batch in stream_users_in_batches(batch_size, columnar=True,
+                                             where=over_25):
+            for i in range(len(batch["age"])):
+                print({column: values[i] for column, values in batch.items()})
+        return
+
+    for batch in stream_users_in_batches(batch_size, where=over_25):  # loop #2
         for user in batch:  # loop #3
-            if user["age"] > 25:
-                print(user)
+            print(user)
+
+
+def stream_users_with_checkpoints(batch_size, checkpoint=None, where=None):
+    """
+    Generator that streams batches in user_id order with a resume token.
+
+    Args:
+        batch_size (int): Number of rows per batch.
+        checkpoint (str): Token of the last batch already processed;
+            None starts from the first row.
+        where (Predicate): Extra filter evaluated by the database.
+
+    Yields:
+        tuple: (batch, checkpoint) where checkpoint is the user_id of the
+        last row of the batch. Passing it back resumes after the batch.
+
+    Raises:
+        mysql.connector.Error: When the database fails mid-stream, so an
+        interrupted job is not mistaken for a finished one.
+    """
+    if checkpoint is not None:
+        resume = col("user_id") > checkpoint
+        where = resume if where is None else where & resume
+    for batch in stream_users_in_batches(batch_size, where=where,
+                                         order_by=["user_id"],
+                                         raise_errors=True):
+        yield batch, batch[-1]["user_id"]
+
+
+def load_checkpoint(path):
+    """Read a saved checkpoint token, None when there is none yet"""
+    try:
+        with open(path, encoding="utf-8") as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    """Atomically replace the checkpoint token stored at path"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        file.write(checkpoint)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def resume_batch_processing(batch_size, checkpoint_path):
+    """
+    Run batch_processing from the last checkpoint saved at checkpoint_path.
+
+    The checkpoint is saved after every batch, so a job that dies redoes
+    at most the batch it was working on. Database errors are raised, so
+    the job fails visibly and can be run again to resume.
+
+    Args:
+        batch_size (int): Number of rows per batch.
+        checkpoint_path (str): File holding the checkpoint token.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    over_25 = col("age") > 25
+    for batch, checkpoint in stream_users_with_checkpoints(
+            batch_size, checkpoint, over_25):
+        for user in batch:
+            print(user)
+        save_checkpoint(checkpoint_path, checkpoint)
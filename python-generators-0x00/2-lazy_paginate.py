@@ -3,43 +3,229 @@
 Lazy loading paginated data using Python generators.
 """
 
+import queue
+import threading
+
 import seed
 
+# markers for the items handed over by prefetch_pages()
+_PAGE, _DONE, _ERROR = object(), object(), object()
+
 
-def paginate_users(page_size, offset):
+def fetch_page(query, params, connection=None):
+    """
+    Run a page query and return all of its rows.
+
+    Args:
+        query (str): SELECT statement for the page.
+        params (list): Values bound to the query placeholders.
+        connection: Open connection to reuse. When None a new connection
+            is opened and closed around the query.
+
+    Returns:
+        list[dict]: A list of user rows as dictionaries.
+    """
+    owned = connection is None
+    if owned:
+        connection = seed.connect_to_prodev()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        if owned:
+            connection.close()
+
+
+def paginate_users(page_size, offset, connection=None):
     """
     Fetch a page of users from the user_data table.
 
     Args:
         page_size (int): Number of rows per page.
         offset (int): Starting offset.
+        connection: Open connection to reuse, see fetch_page().
 
     Returns:
         list[dict]: A list of user rows as dictionaries.
     """
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return rows
+    return fetch_page(
+        "SELECT * FROM user_data LIMIT %s OFFSET %s",
+        [page_size, offset],
+        connection,
+    )
+
+
+def paginate_users_after(page_size, last_key=None, key="user_id",
+                         connection=None):
+    """
+    Fetch the page of users that follows last_key (keyset pagination).
+
+    Rows are ordered by key, with user_id as a tie-breaker, so the
+    database seeks straight to the page through the index instead of
+    scanning and discarding every row before an OFFSET.
+
+    Args:
+        page_size (int): Number of rows per page.
+        last_key (tuple): Sort key of the last row already seen, as
+            returned by page_key(). None starts from the first row.
+        key (str): Indexed column to page on, one of
+            seed.INDEXED_COLUMNS; other columns would need a filesort
+            on every page.
+        connection: Open connection to reuse, see fetch_page().
+
+    Returns:
+        list[dict]: A list of user rows as dictionaries.
+    """
+    if key not in seed.INDEXED_COLUMNS:
+        raise ValueError(f"Pagination key must be an indexed column, "
+                         f"not: {key}")
+
+    query = "SELECT * FROM user_data"
+    params = []
+    if key == "user_id":
+        if last_key is not None:
+            query += " WHERE user_id > %s"
+            params.extend(last_key)
+        query += " ORDER BY user_id"
+    else:
+        if last_key is not None:
+            # a row comparison keeps range access on the index
+            query += f" WHERE ({key}, user_id) > (%s, %s)"
+            params.extend(last_key)
+        query += f" ORDER BY {key}, user_id"
+    query += " LIMIT %s"
+    params.append(page_size)
+    return fetch_page(query, params, connection)
 
 
-def lazy_pagination(page_size):
+def page_key(row, key="user_id"):
+    """
+    Build the keyset position of a row, to resume pagination after it.
+
+    Args:
+        row (dict): A user row.
+        key (str): Column the pages are ordered by.
+
+    Returns:
+        tuple: The sort key of the row.
+    """
+    if key == "user_id":
+        return (row["user_id"],)
+    return (row[key], row["user_id"])
+
+
+def lazy_pagination(page_size, keyset=False, key="user_id", after=None,
+                    connection=None, prefetch=0):
     """
     Generator that lazily fetches paginated user data.
 
+    All pages are read over a single connection. When none is passed in,
+    one is opened on the first page and closed when the generator is
+    exhausted, closed early or garbage collected.
+
     Args:
         page_size (int): Number of rows per page.
+        keyset (bool): Page by seeking past the last key seen instead of
+            using LIMIT/OFFSET, so every page costs the same.
+        key (str): Indexed column to order keyset pages by.
+        after (tuple): Keyset position to resume from, as returned by
+            page_key() for the last row already processed.
+        connection: Open connection to read pages with, e.g. one taken
+            from a mysql.connector pool. It is left open for the caller.
+            With prefetch it is used from the background thread only.
+        prefetch (int): Pages to load ahead on a background thread while
+            the caller works on the current one, 0 to fetch on demand.
 
     Yields:
         list[dict]: A page of user rows.
     """
-    offset = 0
-    while True:  # ✅ only one loop
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
-        yield page
-        offset += page_size
+    pages = _iter_pages(page_size, keyset, key, after, connection)
+    if prefetch > 0:
+        pages = prefetch_pages(pages, prefetch)
+    yield from pages
+
+
+def _iter_pages(page_size, keyset, key, after, connection):
+    """Read pages one after the other, see lazy_pagination()"""
+    owned = connection is None
+    if owned:
+        connection = seed.connect_to_prodev()
+    try:
+        if keyset:
+            last_key = after
+            while True:
+                page = paginate_users_after(page_size, last_key, key,
+                                            connection)
+                if not page:
+                    break
+                yield page
+                if len(page) < page_size:
+                    break
+                last_key = page_key(page[-1], key)
+            return
+
+        offset = 0
+        while True:  # ✅ only one loop
+            page = paginate_users(page_size, offset, connection)
+            if not page:
+                break
+            yield page
+            offset += page_size
+    finally:
+        if owned:
+            connection.close()
+
+
+def prefetch_pages(pages, depth):
+    """
+    Generator that reads pages on a background thread, up to depth ahead.
+
+    Errors raised while fetching are re-raised to the consumer in order.
+    Closing the generator stops the thread and closes pages from it, so
+    any connection the pages hold is released by the thread that used it.
+
+    Args:
+        pages (generator): Not yet started generator of pages.
+        depth (int): Maximum number of pages waiting to be consumed.
+
+    Yields:
+        The items of pages, in order.
+    """
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for page in pages:
+                if not put((_PAGE, page)):
+                    return
+            put((_DONE, None))
+        except Exception as err:
+            put((_ERROR, err))
+        finally:
+            pages.close()
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            kind, value = ready.get()
+            if kind is _DONE:
+                return
+            if kind is _ERROR:
+                raise value
+            yield value
+    finally:
+        stop.set()
+        worker.join()
@@ -4,7 +4,14 @@ Memory-efficient aggregation with generators.
 Compute the average age of users without loading all data into memory.
 """
 
+import math
+import uuid
+from statistics import NormalDist
+
+import mysql.connector
+
 import seed
+from aggregates import StreamingStats, sql_summary, summarize
 
 
 def stream_user_ages():
@@ -23,6 +30,70 @@ def stream_user_ages():
     connection.close()
 
 
+def stream_sampled_user_ages(block_size=32):
+    """
+    Endless generator of ages from randomly placed blocks of user_data.
+
+    user_id holds uuid4 strings, which are uniformly spread, so seeking to
+    a fresh random uuid through the primary key lands on a random row.
+    Each block is one index seek instead of a table scan.
+
+    Args:
+        block_size (int): Consecutive rows read after each random seek.
+
+    Yields:
+        int: Age of a sampled user; stops only if the table is empty.
+    """
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    try:
+        while True:
+            start = str(uuid.uuid4())
+            cursor.execute(
+                "SELECT age FROM user_data WHERE user_id >= %s "
+                "ORDER BY user_id LIMIT %s",
+                (start, block_size),
+            )
+            rows = cursor.fetchall()
+            if len(rows) < block_size:
+                # wrap around past the largest key
+                cursor.execute(
+                    "SELECT age FROM user_data ORDER BY user_id LIMIT %s",
+                    (block_size - len(rows),),
+                )
+                rows += cursor.fetchall()
+            if not rows:
+                return
+            for (age,) in rows:
+                yield age
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def summarize_user_ages(push_down=False, bin_width=10):
+    """
+    Compute every age aggregate in a single scan of user_data.
+
+    Args:
+        push_down (bool): Let MySQL compute count, mean, variance, min,
+            max and the histogram, so no rows are streamed. Quantiles
+            are only available from the streaming path.
+        bin_width (int): Width of the age histogram bins.
+
+    Returns:
+        dict: count, mean, variance, stddev, min, max, histogram and
+        quantiles, see aggregates.StreamingStats.as_dict().
+    """
+    if push_down:
+        connection = seed.connect_to_prodev()
+        try:
+            return sql_summary(connection, bin_width)
+        finally:
+            connection.close()
+    return summarize(stream_user_ages(), bin_width).as_dict()
+
+
 def calculate_average_age():
     """
     Calculate the average age using the stream_user_ages generator.
@@ -30,6 +101,8 @@ def calculate_average_age():
     Prints:
         str: Average age of users.
     """
+    # a mean only needs a running sum and count; summarize_user_ages()
+    # has the full statistics
     total, count = 0, 0
     for age in stream_user_ages():  # ✅ loop #2
         total += age
@@ -39,5 +112,160 @@ def calculate_average_age():
     print(f"Average age of users: {average:.2f}")
 
 
+def read_age_aggregates():
+    """
+    Read the age aggregates maintained by seed.create_age_aggregates().
+
+    Returns:
+        dict: count, sum, mean, variance and histogram (age: users),
+        looked up without scanning user_data.
+    """
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    try:
+        # the aggregates are sharded per writer connection
+        cursor.execute(
+            "SELECT COALESCE(SUM(row_count), 0), COALESCE(SUM(age_sum), 0), "
+            "COALESCE(SUM(age_sum_squares), 0) FROM user_age_stats"
+        )
+        count, total, squares = cursor.fetchone()
+        count = int(count)
+        cursor.execute(
+            "SELECT age, SUM(row_count) AS users FROM user_age_histogram "
+            "GROUP BY age HAVING users > 0 ORDER BY age"
+        )
+        histogram = {int(age): int(users)
+                     for age, users in cursor.fetchall()}
+    finally:
+        cursor.close()
+        connection.close()
+
+    mean = float(total) / count if count else None
+    variance = float(squares) / count - mean * mean if count else None
+    return {
+        "count": count,
+        "sum": total,
+        "mean": mean,
+        "variance": variance,
+        "histogram": histogram,
+    }
+
+
+def average_age_from_aggregates():
+    """
+    Print the average age in O(1) from the maintained aggregates.
+
+    Returns:
+        float: Average age of users, 0 when there are none.
+    """
+    average = read_age_aggregates()["mean"] or 0
+    print(f"Average age of users: {average:.2f}")
+    return average
+
+
+def verify_age_aggregates():
+    """
+    Check the maintained aggregates against a full recompute.
+
+    Returns:
+        bool: True when count and sum match user_data.
+    """
+    stored = read_age_aggregates()
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(age), 0) FROM user_data"
+        )
+        count, total = cursor.fetchone()
+    finally:
+        cursor.close()
+        connection.close()
+
+    consistent = stored["count"] == count and stored["sum"] == total
+    if not consistent:
+        print("Age aggregates are out of date, "
+              "run seed.rebuild_age_aggregates()")
+    return consistent
+
+
+def estimate_average_age(margin=0.5, confidence=0.95, min_samples=200,
+                         max_samples=100000):
+    """
+    Estimate the average age from random samples, with an error bound.
+
+    Sampling stops as soon as the confidence interval of the mean is no
+    wider than +/- margin years, or after max_samples ages. When an exact
+    answer is as cheap, it is returned with a bound of 0 instead: from
+    the maintained aggregates when they exist, or from AVG(age) when the
+    table holds no more than max_samples rows.
+
+    Args:
+        margin (float): Target half-width of the confidence interval.
+        confidence (float): Confidence level of the interval.
+        min_samples (int): Ages to read before the interval is trusted.
+        max_samples (int): Hard limit on the ages read.
+
+    Returns:
+        tuple: (estimate, error bound, number of samples).
+
+    Prints:
+        str: Estimated average age and its error bound.
+    """
+    exact = _exact_average_age(max_samples)
+    if exact is not None:
+        average, count = exact
+        print(f"Average age of users: {average:.2f} (exact, {count} users)")
+        return average, 0.0, count
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    stats = StreamingStats()
+    bound = math.inf
+    for age in stream_sampled_user_ages():
+        stats.update(age)
+        if stats.count < min_samples:
+            continue
+        bound = z * stats.stddev / math.sqrt(stats.count)
+        if bound <= margin or stats.count >= max_samples:
+            break
+    if stats.count == 0:
+        return 0, 0.0, 0
+    print(f"Average age of users: {stats.mean:.2f} +/- {bound:.2f} "
+          f"({confidence:.0%} confidence, {stats.count} samples)")
+    return stats.mean, bound, stats.count
+
+
+def _exact_average_age(max_rows):
+    """
+    Exact (average, count) when it costs no more than sampling.
+
+    Returns:
+        tuple: The average age and number of users, or None when the
+        aggregates are missing and user_data has more than max_rows rows.
+    """
+    try:
+        stored = read_age_aggregates()
+        if stored["count"]:
+            return stored["mean"], stored["count"]
+    except mysql.connector.Error:
+        pass  # aggregates not created
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    try:
+        # counts at most max_rows + 1 rows, not the whole table
+        cursor.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM user_data LIMIT %s) AS probe",
+            (max_rows + 1,),
+        )
+        count = int(cursor.fetchone()[0])
+        if count > max_rows:
+            return None
+        cursor.execute("SELECT COALESCE(AVG(age), 0) FROM user_data")
+        return float(cursor.fetchone()[0]), count
+    finally:
+        cursor.close()
+        connection.close()
+
+
 if __name__ == "__main__":
     calculate_average_age()
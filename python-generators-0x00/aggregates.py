@@ -0,0 +1,276 @@
+#!/usr/bin/python3
+"""
+One-pass streaming aggregates over a stream of numbers.
+
+StreamingStats folds values in one at a time and keeps count, mean and
+variance (Welford), min/max, a fixed-width histogram and a t-digest for
+approximate quantiles, all in memory independent of the stream length.
+sql_summary() is the fast path that lets MySQL compute the aggregates it
+supports natively without sending any rows.
+"""
+
+import math
+from fractions import Fraction
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class TDigest:
+    """
+    Merging t-digest sketch for approximate quantiles.
+
+    Values are buffered and periodically merged into centroids whose size
+    is bounded by the arcsine scale function, so the tails stay accurate
+    while the whole sketch holds roughly `compression` centroids.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._centroids = []
+        self._buffer = []
+
+    def add(self, value, weight=1):
+        """Add a value with an optional weight"""
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another digest into this one"""
+        other._compress()
+        for mean, weight in other._centroids:
+            self.add(mean, weight)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _k(self, q):
+        """Arcsine scale function mapping a quantile to a centroid index"""
+        q = min(max(q, 0.0), 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self):
+        """Merge buffered values into the centroid list"""
+        if not self._buffer:
+            return
+        points = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        total = self.count
+        merged = []
+        mean, weight = points[0]
+        before = 0
+        k_low = self._k(0)
+        for point_mean, point_weight in points[1:]:
+            if self._k((before + weight + point_weight) / total) - k_low <= 1:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                merged.append((mean, weight))
+                before += weight
+                k_low = self._k(before / total)
+                mean, weight = point_mean, point_weight
+        merged.append((mean, weight))
+        self._centroids = merged
+
+    def quantile(self, q):
+        """
+        Estimate the value at quantile q.
+
+        Args:
+            q (float): Quantile between 0 and 1.
+
+        Returns:
+            float: The estimate, or None when no values were added.
+        """
+        self._compress()
+        if not self._centroids:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        target = q * self.count
+        previous_mean, previous_center = self.min, 0
+        cumulative = 0
+        for mean, weight in self._centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                return _interpolate(previous_mean, previous_center,
+                                    mean, center, target)
+            previous_mean, previous_center = mean, center
+            cumulative += weight
+        return _interpolate(previous_mean, previous_center,
+                            self.max, self.count, target)
+
+
+def _interpolate(low_value, low_rank, high_value, high_rank, rank):
+    """Linear interpolation of a value between two ranks"""
+    if high_rank <= low_rank:
+        return high_value
+    fraction = (rank - low_rank) / (high_rank - low_rank)
+    return low_value + (high_value - low_value) * fraction
+
+
+class StreamingStats:
+    """
+    Count, mean, variance, min/max, histogram and quantiles in one pass.
+
+    Args:
+        bin_width (float): Width of the histogram bins.
+        compression (int): Size parameter of the quantile sketch.
+    """
+
+    def __init__(self, bin_width=10, compression=100):
+        self.bin_width = bin_width
+        self.count = 0
+        self.mean = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = {}
+        self.digest = TDigest(compression)
+        self._m2 = 0.0
+
+    def update(self, value):
+        """Fold one value into every aggregate"""
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        low = float(math.floor(value / self.bin_width) * self.bin_width)
+        self.histogram[low] = self.histogram.get(low, 0) + 1
+        self.digest.add(value)
+
+    def update_many(self, values):
+        """Fold every value of an iterable, returning self"""
+        for value in values:
+            self.update(value)
+        return self
+
+    def merge(self, other):
+        """
+        Combine the aggregates of another StreamingStats into this one,
+        e.g. partial results computed over separate partitions.
+        """
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += (other._m2
+                     + delta * delta * self.count * other.count / count)
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        for low, hits in other.histogram.items():
+            self.histogram[low] = self.histogram.get(low, 0) + hits
+        self.digest.merge(other.digest)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance, None for an empty stream"""
+        return self._m2 / self.count if self.count else None
+
+    @property
+    def stddev(self):
+        """Population standard deviation, None for an empty stream"""
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def quantile(self, q):
+        """Approximate value at quantile q, see TDigest.quantile()"""
+        return self.digest.quantile(q)
+
+    def as_dict(self, quantiles=DEFAULT_QUANTILES):
+        """Snapshot of every aggregate as a plain dict"""
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "variance": self.variance,
+            "stddev": self.stddev,
+            "min": self.min,
+            "max": self.max,
+            "histogram": dict(sorted(self.histogram.items())),
+            "quantiles": {q: self.quantile(q) for q in quantiles},
+        }
+
+
+def summarize(values, bin_width=10, compression=100):
+    """
+    Compute every streaming aggregate over an iterable in one pass.
+
+    Returns:
+        StreamingStats: The folded aggregates.
+    """
+    return StreamingStats(bin_width, compression).update_many(values)
+
+
+def sql_summary(connection, bin_width=10):
+    """
+    Compute the age aggregates MySQL supports natively, without streaming
+    any rows to Python.
+
+    A single GROUP BY over the histogram bins returns count, sum, sum of
+    squares, min and max per bin, so the whole summary costs one scan;
+    the totals are folded from the bins exactly.
+
+    Quantiles have no native MySQL aggregate and are reported as None; use
+    summarize() when they are needed.
+
+    Args:
+        connection: Connection to the ALX_prodev database.
+        bin_width (int): Width of the histogram bins.
+
+    Returns:
+        dict: Same layout as StreamingStats.as_dict().
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT FLOOR(age / %s) * %s AS bin, COUNT(age), SUM(age), "
+            "SUM(age * age), MIN(age), MAX(age) "
+            "FROM user_data WHERE age IS NOT NULL GROUP BY bin ORDER BY bin",
+            (bin_width, bin_width),
+        )
+        bins = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    histogram = {}
+    count, total, squares = 0, Fraction(0), Fraction(0)
+    low = high = None
+    for low_edge, hits, bin_sum, bin_squares, bin_min, bin_max in bins:
+        histogram[float(low_edge)] = int(hits)
+        count += int(hits)
+        total += Fraction(bin_sum)
+        squares += Fraction(bin_squares)
+        low = bin_min if low is None else min(low, bin_min)
+        high = bin_max if high is None else max(high, bin_max)
+    mean = variance = None
+    if count:
+        mean = float(total / count)
+        variance = float(squares / count - (total / count) ** 2)
+        low, high = float(low), float(high)
+
+    return {
+        "count": int(count),
+        "mean": mean,
+        "variance": variance,
+        "stddev": math.sqrt(variance) if variance is not None else None,
+        "min": low,
+        "max": high,
+        "histogram": histogram,
+        "quantiles": {q: None for q in DEFAULT_QUANTILES},
+    }
+
@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+"""
+Async generator versions of the user_data streaming functions.
+
+The blocking mysql.connector calls run through asyncio.to_thread, one
+fetch at a time, so a stream only borrows a worker thread while a round
+trip is in flight. Many streams can share one event loop, and each keeps
+at most one fetchmany() batch in memory.
+"""
+
+import asyncio
+
+import mysql.connector
+
+import seed
+from predicates import build_select
+
+lazy_paginate = __import__("2-lazy_paginate")
+
+
+async def _stream_query(query, params, size):
+    """
+    Async generator running a query on an unbuffered cursor.
+
+    Yields:
+        list[dict]: Up to size rows per round trip.
+    """
+    connection = await asyncio.to_thread(seed.connect_to_prodev)
+    if connection is None:
+        return
+    cursor = connection.cursor(dictionary=True, buffered=False)
+    try:
+        await asyncio.to_thread(cursor.execute, query, params)
+        while True:
+            rows = await asyncio.to_thread(cursor.fetchmany, size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            await asyncio.to_thread(cursor.close)
+        except mysql.connector.Error:
+            # rows left unread by an early close go with the connection
+            pass
+        await asyncio.to_thread(connection.close)
+
+
+async def async_stream_users(read_ahead=500):
+    """
+    Async generator that streams rows from user_data one by one.
+
+    Args:
+        read_ahead (int): Rows fetched per round trip.
+
+    Yields:
+        dict: A row with keys user_id, name, email, age.
+    """
+    query, params = build_select()
+    async for rows in _stream_query(query, params, read_ahead):
+        for row in rows:
+            yield row
+
+
+async def async_stream_users_in_batches(batch_size, where=None,
+                                        columns=None):
+    """
+    Async generator that fetches rows from user_data in batches.
+
+    Args:
+        batch_size (int): Number of rows per batch.
+        where (Predicate): Filter evaluated by the database.
+        columns (list[str]): Columns to select, all of them when None.
+
+    Yields:
+        list[dict]: A batch of rows as dictionaries.
+    """
+    query, params = build_select(columns, where)
+    async for rows in _stream_query(query, params, batch_size):
+        yield rows
+
+
+async def async_lazy_pagination(page_size, keyset=False, key="user_id",
+                                after=None):
+    """
+    Async generator that lazily fetches paginated user data over a single
+    connection, see 2-lazy_paginate.lazy_pagination().
+
+    Yields:
+        list[dict]: A page of user rows.
+    """
+    connection = await asyncio.to_thread(seed.connect_to_prodev)
+    if connection is None:
+        return
+    try:
+        offset, last_key = 0, after
+        while True:
+            if keyset:
+                page = await asyncio.to_thread(
+                    lazy_paginate.paginate_users_after,
+                    page_size, last_key, key, connection,
+                )
+            else:
+                page = await asyncio.to_thread(
+                    lazy_paginate.paginate_users,
+                    page_size, offset, connection,
+                )
+            if not page:
+                break
+            yield page
+            if len(page) < page_size:
+                break
+            offset += page_size
+            last_key = lazy_paginate.page_key(page[-1], key)
+    finally:
+        await asyncio.to_thread(connection.close)
+
+
+async def _main():
+    """Count users over three concurrent streams on one event loop"""
+    async def count(stream):
+        total = 0
+        async for item in stream:
+            total += len(item) if isinstance(item, list) else 1
+        return total
+
+    print(await asyncio.gather(
+        count(async_stream_users()),
+        count(async_stream_users_in_batches(100)),
+        count(async_lazy_pagination(100, keyset=True)),
+    ))
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
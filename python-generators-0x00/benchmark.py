@@ -0,0 +1,318 @@
+#!/usr/bin/python3
+"""
+Benchmark harness for the user_data streaming generators.
+
+The generators run unchanged against a SQLite stand-in for ALX_prodev:
+mysql.connector.connect and seed.connect_to_prodev are pointed at a local
+database seeded with synthetic users, so no MySQL server is needed. Each
+case runs in a fresh interpreter to get a clean peak RSS, and measures
+rows/sec and time to first row. Results are written as JSON so runs from
+different commits can be compared:
+
+    ./benchmark.py --sizes 10000,1000000 --output after.json
+    ./benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class StandInCursor:
+    """mysql.connector-style cursor over a sqlite3 cursor"""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value
+                for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, query, params=()):
+        self._cursor.execute(query.replace("%s", "?"), tuple(params))
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(query.replace("%s", "?"), seq_params)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    """mysql.connector-style connection to the SQLite stand-in database"""
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, dictionary=False, buffered=None):
+        return StandInCursor(self._connection, dictionary)
+
+    def start_transaction(self, **kwargs):
+        pass
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+def seed_stand_in(path, count, batch_size=50000):
+    """Create or reuse a SQLite user_data table holding count users"""
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS user_data ("
+            "user_id CHAR(36) PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+            "email VARCHAR(255) NOT NULL UNIQUE, age INTEGER NOT NULL)"
+        )
+        existing = connection.execute(
+            "SELECT COUNT(*) FROM user_data"
+        ).fetchone()[0]
+        if existing == count:
+            return
+        connection.execute("DELETE FROM user_data")
+        generator = random.Random(count)
+        for start in range(0, count, batch_size):
+            connection.executemany(
+                "INSERT INTO user_data VALUES (?, ?, ?, ?)",
+                [(str(uuid.UUID(int=generator.getrandbits(128), version=4)),
+                  f"User {i}", f"user{i}@example.com",
+                  generator.randint(18, 90))
+                 for i in range(start, min(start + batch_size, count))],
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def install_stand_in(path):
+    """Route every database connection of the generators to path"""
+    sys.path.insert(0, HERE)
+    import mysql.connector
+    import seed
+
+    def connect(**kwargs):
+        return StandInConnection(path)
+
+    mysql.connector.connect = connect
+    seed.connect_to_prodev = lambda: StandInConnection(path)
+
+
+def _call(module, function, *args, **kwargs):
+    """Build a case that calls module.function lazily"""
+    return lambda: getattr(importlib.import_module(module),
+                           function)(*args, **kwargs)
+
+
+def _one(item):
+    return 1
+
+
+def _many(item):
+    return len(item)
+
+
+def _columns(item):
+    return len(item["age"])
+
+
+# case name: (generator factory, rows in one yielded item)
+CASES = {
+    "stream_users": (_call("0-stream_users", "stream_users"), _one),
+    "stream_users_unbuffered": (
+        _call("0-stream_users", "stream_users", unbuffered=True), _one),
+    "stream_users_record": (
+        _call("0-stream_users", "stream_users", row_type="record"), _one),
+    "stream_users_in_batches": (
+        _call("1-batch_processing", "stream_users_in_batches", 1000), _many),
+    "stream_users_in_batches_columnar": (
+        _call("1-batch_processing", "stream_users_in_batches", 1000,
+              columnar=True), _columns),
+    "stream_users_adaptive": (
+        _call("1-batch_processing", "stream_users_adaptive"), _many),
+    "lazy_pagination_offset": (
+        _call("2-lazy_paginate", "lazy_pagination", 1000), _many),
+    "lazy_pagination_keyset": (
+        _call("2-lazy_paginate", "lazy_pagination", 1000, keyset=True),
+        _many),
+    "lazy_pagination_prefetch": (
+        _call("2-lazy_paginate", "lazy_pagination", 1000, keyset=True,
+              prefetch=2), _many),
+    "stream_user_ages": (_call("4-stream_ages", "stream_user_ages"), _one),
+}
+
+
+def run_case(name, path):
+    """
+    Consume one generator to the end against the stand-in database.
+
+    Returns:
+        dict: rows, seconds, rows_per_second, first_row_seconds and
+        peak_rss_bytes of the run.
+    """
+    install_stand_in(path)
+    factory, rows_in = CASES[name]
+    rows = 0
+    first_row = None
+    started = time.perf_counter()
+    for item in factory():
+        if first_row is None:
+            first_row = time.perf_counter() - started
+        rows += rows_in(item)
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else None,
+        "first_row_seconds": first_row,
+        "peak_rss_bytes": peak_rss(),
+    }
+
+
+def peak_rss():
+    """Peak resident set size of this process, in bytes"""
+    # ru_maxrss survives execve on Linux and would report the parent's
+    # peak, so prefer the per-address-space high-water mark
+    try:
+        with open("/proc/self/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_suite(sizes, cases, workdir):
+    """Seed a stand-in per size and run every case in a subprocess"""
+    results = []
+    for size in sizes:
+        path = os.path.join(workdir, f"bench_users_{size}.db")
+        seed_stand_in(path, size)
+        for name in cases:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__),
+                 "--run-case", name, "--db", path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result.update(case=name, size=size)
+            results.append(result)
+            print(f"{name:>34} {size:>9} rows: "
+                  f"{result['rows_per_second'] or 0:>12.0f} rows/s  "
+                  f"first row {result['first_row_seconds'] or 0:.4f}s  "
+                  f"peak {result['peak_rss_bytes'] / 2 ** 20:.1f} MiB",
+                  file=sys.stderr)
+    return results
+
+
+def _git_commit():
+    """Commit the benchmark ran on, None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=HERE, check=True,
+            capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path):
+    """Print the rows/sec and peak RSS change of every shared case"""
+    with open(before_path, encoding="utf-8") as file:
+        before = json.load(file)
+    with open(after_path, encoding="utf-8") as file:
+        after = json.load(file)
+    baseline = {(result["case"], result["size"]): result
+                for result in before["results"]}
+    for result in after["results"]:
+        old = baseline.get((result["case"], result["size"]))
+        if old is None or not old["rows_per_second"]:
+            continue
+        speed = result["rows_per_second"] / old["rows_per_second"] - 1
+        memory = result["peak_rss_bytes"] / old["peak_rss_bytes"] - 1
+        print(f"{result['case']:>34} {result['size']:>9}: "
+              f"rows/s {speed:+.1%}  peak RSS {memory:+.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma separated user counts to seed")
+    parser.add_argument("--cases", default=",".join(CASES),
+                        help="comma separated case names")
+    parser.add_argument("--workdir", default=".",
+                        help="directory for the stand-in databases")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.db)))
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    cases = args.cases.split(",")
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.time(),
+        "results": run_suite(sizes, cases, args.workdir),
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
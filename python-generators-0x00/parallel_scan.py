@@ -0,0 +1,225 @@
+#!/usr/bin/python3
+"""
+Parallel partitioned scans of the user_data table.
+
+The table is split on user_id into contiguous key ranges or hash buckets,
+and every partition is streamed over its own connection in a worker
+process. Workers reduce each batch with a caller-supplied function and
+send the (small) results back to the parent process as they are
+produced.
+"""
+
+import multiprocessing
+import os
+import pickle
+import queue
+
+import seed
+from aggregates import StreamingStats
+from predicates import Predicate, build_select
+
+# user_id holds uuid4 strings, so their leading hex digits are uniform
+KEY_PREFIX_SPACE = 16 ** 4
+
+
+def range_partitions(partitions):
+    """
+    Split the user_id key space into contiguous, ordered ranges.
+
+    Args:
+        partitions (int): Number of ranges.
+
+    Returns:
+        list[Predicate]: One filter per range, in key order.
+    """
+    bounds = [format(KEY_PREFIX_SPACE * i // partitions, "04x")
+              for i in range(1, partitions)]
+    predicates = []
+    for low, high in zip([None] + bounds, bounds + [None]):
+        clauses, params = [], []
+        if low is not None:
+            clauses.append("user_id >= %s")
+            params.append(low)
+        if high is not None:
+            clauses.append("user_id < %s")
+            params.append(high)
+        predicates.append(Predicate(f"({' AND '.join(clauses) or '1 = 1'})",
+                                    params))
+    return predicates
+
+
+def hash_partitions(partitions):
+    """
+    Split user_data into buckets on a hash of user_id.
+
+    Args:
+        partitions (int): Number of buckets.
+
+    Returns:
+        list[Predicate]: One filter per bucket.
+    """
+    return [Predicate("(MOD(CRC32(user_id), %s) = %s)", [partitions, bucket])
+            for bucket in range(partitions)]
+
+
+def scan_partition(func, where, batch_size=1000, ordered=False):
+    """
+    Generator that streams one partition over its own connection and
+    reduces its batches.
+
+    Runs inside the worker processes, but works the same when called
+    directly.
+
+    Args:
+        func (callable): Picklable function applied to each list of rows.
+        where (Predicate): Filter selecting the partition.
+        batch_size (int): Rows fetched per round trip and passed to func.
+        ordered (bool): Read the partition in user_id order.
+
+    Yields:
+        func(batch) for every batch of the partition, as it is read.
+    """
+    query, params = build_select(
+        where=where, order_by=["user_id"] if ordered else None
+    )
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchmany(batch_size)
+        while rows:
+            yield func(rows)
+            rows = cursor.fetchmany(batch_size)
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def _scan_worker(func, where, batch_size, ordered, results):
+    """Worker process body: send a partition's results through a queue"""
+    try:
+        for result in scan_partition(func, where, batch_size, ordered):
+            results.put(("result", result))
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(repr(e))  # driver errors may not pickle
+        results.put(("error", e))
+    else:
+        results.put(("done", None))
+
+
+def parallel_scan(func, partitions=None, mode="range", ordered=True,
+                  batch_size=1000, workers=None, queue_size=4):
+    """
+    Generator that scans user_data in parallel and yields batch results.
+
+    Each partition runs in its own worker process and sends every batch
+    result back as soon as it is computed, through a queue holding at
+    most queue_size results: the first results arrive without waiting
+    for a partition to finish, and a slow consumer pauses the workers
+    instead of letting results pile up. Closing the generator early
+    terminates the running scans.
+
+    Args:
+        func (callable): Picklable function applied to each batch of rows
+            (list[dict]) inside the workers, e.g. a count or a partial
+            aggregate.
+        partitions (int): Number of partitions, the CPU count when None.
+        mode (str): "range" for contiguous user_id ranges or "hash" for
+            CRC32 buckets.
+        ordered (bool): Yield results in partition order, which in range
+            mode is user_id order. Otherwise yield results from every
+            partition as they arrive.
+        batch_size (int): Rows per batch handed to func.
+        workers (int): Partitions scanned at once, all when None.
+        queue_size (int): Results buffered per running partition.
+
+    Yields:
+        The result of func for every batch of the table.
+    """
+    partitions = partitions or os.cpu_count() or 1
+    if mode == "range":
+        filters = range_partitions(partitions)
+    elif mode == "hash":
+        filters = hash_partitions(partitions)
+    else:
+        raise ValueError(f"Unknown partition mode: {mode}")
+    workers = min(workers or partitions, partitions)
+
+    context = multiprocessing.get_context()
+    if ordered:
+        queues = [context.Queue(queue_size) for _ in filters]
+    else:
+        queues = [context.Queue(queue_size * workers)] * partitions
+    processes = [
+        context.Process(target=_scan_worker, daemon=True,
+                        args=(func, where, batch_size, ordered,
+                              queues[index]))
+        for index, where in enumerate(filters)
+    ]
+    started = 0
+    finished = 0
+    try:
+        # partitions are started in order and a new one only when a
+        # running one is done, so at most `workers` scan at once
+        for process in processes[:workers]:
+            process.start()
+        started = workers
+        while finished < partitions:
+            source = queues[finished]  # the same queue when unordered
+            kind, value = _next_message(source, processes[:started])
+            if kind == "result":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                finished += 1
+                if started < partitions:
+                    processes[started].start()
+                    started += 1
+    finally:
+        for process in processes[:started]:
+            if process.is_alive():
+                process.terminate()
+        for process in processes[:started]:
+            process.join()
+        for results in set(queues):
+            results.close()
+
+
+def _next_message(results, running, poll=1.0):
+    """Next (kind, value) from a worker, failing if one crashed"""
+    while True:
+        try:
+            return results.get(timeout=poll)
+        except queue.Empty:
+            for process in running:
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError(
+                        f"Partition scan exited with code {process.exitcode}"
+                    )
+
+
+def _age_stats(rows):
+    """Partial age aggregates of one batch"""
+    return StreamingStats().update_many(row["age"] for row in rows)
+
+
+def parallel_age_summary(partitions=None, mode="range"):
+    """
+    Compute the age aggregates of aggregates.StreamingStats in parallel.
+
+    Returns:
+        dict: See aggregates.StreamingStats.as_dict().
+    """
+    total = StreamingStats()
+    for partial in parallel_scan(_age_stats, partitions, mode,
+                                 ordered=False):
+        total.merge(partial)
+    return total.as_dict()
+
+
+if __name__ == "__main__":
+    print(parallel_age_summary())
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""
+Composable filters and projections compiled into SQL for user_data.
+
+    where = (col("age") > 25) & col("email").like("%@gmail.com")
+    query, params = build_select(["name", "age"], where)
+    # SELECT name, age FROM user_data WHERE ((age > %s) AND (email LIKE %s))
+    # [25, '%@gmail.com']
+
+Values are always bound as query parameters and column names are checked
+against seed.USER_COLUMNS, so nothing from the caller is spliced into the
+SQL text.
+"""
+
+import seed
+
+
+class Predicate:
+    """A SQL boolean expression together with its bound parameters"""
+
+    def __init__(self, sql, params=()):
+        self.sql = sql
+        self.params = list(params)
+
+    def __and__(self, other):
+        return Predicate(f"({self.sql} AND {other.sql})",
+                         self.params + other.params)
+
+    def __or__(self, other):
+        return Predicate(f"({self.sql} OR {other.sql})",
+                         self.params + other.params)
+
+    def __invert__(self):
+        return Predicate(f"(NOT {self.sql})", self.params)
+
+    def __repr__(self):
+        return f"Predicate({self.sql!r}, {self.params!r})"
+
+
+class Column:
+    """A user_data column; comparing it builds a Predicate"""
+
+    def __init__(self, name):
+        if name not in seed.USER_COLUMNS:
+            raise ValueError(f"Unknown user_data column: {name}")
+        self.name = name
+
+    def _compare(self, operator, value):
+        return Predicate(f"({self.name} {operator} %s)", [value])
+
+    def __eq__(self, value):
+        return self._compare("=", value)
+
+    def __ne__(self, value):
+        return self._compare("<>", value)
+
+    def __lt__(self, value):
+        return self._compare("<", value)
+
+    def __le__(self, value):
+        return self._compare("<=", value)
+
+    def __gt__(self, value):
+        return self._compare(">", value)
+
+    def __ge__(self, value):
+        return self._compare(">=", value)
+
+    __hash__ = None
+
+    def isin(self, values):
+        """Match rows whose column value is one of values"""
+        values = list(values)
+        if not values:
+            return Predicate("(1 = 0)")
+        placeholders = ", ".join(["%s"] * len(values))
+        return Predicate(f"({self.name} IN ({placeholders}))", values)
+
+    def between(self, low, high):
+        """Match rows whose column value lies in [low, high]"""
+        return Predicate(f"({self.name} BETWEEN %s AND %s)", [low, high])
+
+    def like(self, pattern):
+        """Match rows whose column value matches a SQL LIKE pattern"""
+        return self._compare("LIKE", pattern)
+
+
+def col(name):
+    """Shorthand for Column(name)"""
+    return Column(name)
+
+
+def build_select(columns=None, where=None, order_by=None):
+    """
+    Compile a projection and filter into a SELECT on user_data.
+
+    Args:
+        columns (list[str]): Columns to return, all of them when None.
+        where (Predicate): Filter evaluated by the database.
+        order_by (list[str]): Columns to sort by.
+
+    Returns:
+        tuple: The query string and its list of parameters.
+    """
+    columns = list(columns or seed.USER_COLUMNS)
+    for name in columns + list(order_by or ()):
+        Column(name)
+
+    query = f"SELECT {', '.join(columns)} FROM user_data"
+    params = []
+    if where is not None:
+        query += f" WHERE {where.sql}"
+        params.extend(where.params)
+    if order_by:
+        query += f" ORDER BY {', '.join(order_by)}"
+    return query, params
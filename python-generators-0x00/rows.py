@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""
+Low-allocation row types for the user_data generators.
+
+A dict row carries its own hash table; UserRow is a tuple subclass with
+attribute access and no per-instance __dict__, so every row costs one
+small tuple.
+"""
+
+import time
+import tracemalloc
+import uuid
+from collections import namedtuple
+
+from seed import USER_COLUMNS
+
+UserRow = namedtuple("UserRow", USER_COLUMNS)
+UserRow.__doc__ = "A user_data row: user_id, name, email, age"
+
+ROW_TYPES = ("dict", "tuple", "record")
+
+
+def row_factory(row_type):
+    """
+    Build the converter applied to each tuple fetched from the cursor.
+
+    Args:
+        row_type (str): "dict" for dictionary rows, "tuple" for plain
+            tuples or "record" for UserRow.
+
+    Returns:
+        callable: Converter for the row tuples, None when the cursor
+        already yields the requested type.
+    """
+    if row_type not in ROW_TYPES:
+        raise ValueError(f"Unknown row type: {row_type}")
+    return UserRow._make if row_type == "record" else None
+
+
+def _measure(build):
+    """Build time, then peak traced memory, of one list of rows"""
+    started = time.perf_counter()
+    rows = build()
+    elapsed = time.perf_counter() - started
+    del rows
+    tracemalloc.start()
+    rows = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return elapsed, peak
+
+
+def compare_row_types(count=100000):
+    """
+    Benchmark memory and build time of dict rows against tuple rows.
+
+    Args:
+        count (int): Number of synthetic rows held at once.
+
+    Returns:
+        dict: Row type mapped to (seconds, peak bytes, bytes per row).
+    """
+    # the column values are shared, only the row containers are measured
+    source = [[str(uuid.uuid4()), f"user {i}", f"user{i}@example.com",
+               18 + i % 70] for i in range(count)]
+    builders = {
+        "dict": lambda: [dict(zip(USER_COLUMNS, row)) for row in source],
+        "tuple": lambda: [tuple(row) for row in source],
+        "record": lambda: [UserRow._make(row) for row in source],
+    }
+    results = {}
+    for row_type, build in builders.items():
+        elapsed, peak = _measure(build)
+        results[row_type] = (elapsed, peak, peak / count)
+    return results
+
+
+if __name__ == "__main__":
+    for row_type, (elapsed, peak, per_row) in compare_row_types().items():
+        print(f"{row_type:>6}: {elapsed * 1000:8.1f} ms  "
+              f"{peak / 1024 / 1024:8.1f} MiB  {per_row:6.0f} B/row")
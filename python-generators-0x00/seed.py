@@ -6,7 +6,23 @@ seed.py - Setup and seed ALX_prodev MySQL database with user_data
 import mysql.connector
 from mysql.connector import errorcode
 import csv
+import hashlib
+import io
+import math
+import os
+import queue
+import random
+import threading
+import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from decimal import Decimal, InvalidOperation
+
+
+# columns of user_data, in table order
+USER_COLUMNS = ("user_id", "name", "email", "age")
+# columns with an index: the primary key and uq_user_data_email
+INDEXED_COLUMNS = ("user_id", "email")
 
 
 def connect_db():
@@ -58,7 +74,8 @@ def create_table(connection):
         name VARCHAR(255) NOT NULL,
         email VARCHAR(255) NOT NULL,
         age DECIMAL NOT NULL,
-        INDEX(user_id)
+        INDEX(user_id),
+        UNIQUE INDEX uq_user_data_email (email)
     );
     """
     try:
@@ -72,8 +89,212 @@ def create_table(connection):
         cursor.close()
 
 
-def insert_data(connection, csv_file):
-    """Insert data from CSV into user_data table if not exists"""
+# Rows of each aggregate are sharded by writer connection: a trigger only
+# touches the shard of CONNECTION_ID() % AGE_AGGREGATE_SHARDS, so
+# concurrent writers do not queue behind one hot row lock. Readers sum the
+# shards, which is still a fixed-size lookup.
+AGE_AGGREGATE_SHARDS = 16
+
+AGE_AGGREGATE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS user_age_stats (
+        shard TINYINT PRIMARY KEY,
+        row_count BIGINT NOT NULL,
+        age_sum DECIMAL(30, 0) NOT NULL,
+        age_sum_squares DECIMAL(40, 0) NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_age_histogram (
+        age DECIMAL NOT NULL,
+        shard TINYINT NOT NULL,
+        row_count BIGINT NOT NULL,
+        PRIMARY KEY (age, shard)
+    );
+    """,
+)
+
+# statements adding (sign +) or removing (sign -) one age in the shard of
+# the writing connection; the shard row is created on first use
+_AGE_DELTA = """
+        INSERT INTO user_age_stats
+            (shard, row_count, age_sum, age_sum_squares)
+        VALUES (CONNECTION_ID() % {shards}, {sign}1, {sign}{row}.age,
+                {sign}{row}.age * {row}.age)
+        ON DUPLICATE KEY UPDATE
+            row_count = row_count + VALUES(row_count),
+            age_sum = age_sum + VALUES(age_sum),
+            age_sum_squares = age_sum_squares + VALUES(age_sum_squares);
+        INSERT INTO user_age_histogram (age, shard, row_count)
+        VALUES ({row}.age, CONNECTION_ID() % {shards}, {sign}1)
+        ON DUPLICATE KEY UPDATE row_count = row_count + VALUES(row_count);"""
+_ADD_AGE = _AGE_DELTA.replace("{sign}", "").replace(
+    "{shards}", str(AGE_AGGREGATE_SHARDS))
+_REMOVE_AGE = _AGE_DELTA.replace("{sign}", "-").replace(
+    "{shards}", str(AGE_AGGREGATE_SHARDS))
+
+AGE_AGGREGATE_TRIGGERS = {
+    "user_data_age_insert": f"""
+    CREATE TRIGGER user_data_age_insert AFTER INSERT ON user_data
+    FOR EACH ROW BEGIN{_ADD_AGE.format(row="NEW")}
+    END
+    """,
+    "user_data_age_delete": f"""
+    CREATE TRIGGER user_data_age_delete AFTER DELETE ON user_data
+    FOR EACH ROW BEGIN{_REMOVE_AGE.format(row="OLD")}
+    END
+    """,
+    "user_data_age_update": f"""
+    CREATE TRIGGER user_data_age_update AFTER UPDATE ON user_data
+    FOR EACH ROW BEGIN
+        IF NOT (OLD.age <=> NEW.age) THEN{_REMOVE_AGE.format(row="OLD")}
+{_ADD_AGE.format(row="NEW")}
+        END IF;
+    END
+    """,
+}
+
+
+def create_age_aggregates(connection):
+    """
+    Maintain count, sum, sum of squares and histogram of user ages.
+
+    Triggers on user_data keep user_age_stats and user_age_histogram in
+    step with every insert, update and delete, whoever the writer is, so
+    reading the average age sums at most AGE_AGGREGATE_SHARDS rows.
+    The aggregate tables are recreated and rebuilt from user_data.
+    """
+    try:
+        cursor = connection.cursor()
+        for name in AGE_AGGREGATE_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        # recreated so tables from the unsharded layout are replaced
+        cursor.execute("DROP TABLE IF EXISTS user_age_stats, "
+                       "user_age_histogram")
+        for table_query in AGE_AGGREGATE_TABLES:
+            cursor.execute(table_query)
+        for trigger_query in AGE_AGGREGATE_TRIGGERS.values():
+            cursor.execute(trigger_query)
+        connection.commit()
+        rebuild_age_aggregates(connection)
+        print("Age aggregates on user_data created successfully")
+    except mysql.connector.Error as err:
+        print(f"Error creating age aggregates: {err}")
+    finally:
+        cursor.close()
+
+
+def rebuild_age_aggregates(connection):
+    """Recompute the age aggregates from user_data with writers locked out"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "LOCK TABLES user_data READ, user_age_stats WRITE, "
+            "user_age_histogram WRITE"
+        )
+        cursor.execute("DELETE FROM user_age_stats")
+        cursor.execute("DELETE FROM user_age_histogram")
+        cursor.execute(
+            "INSERT INTO user_age_stats "
+            "(shard, row_count, age_sum, age_sum_squares) "
+            "SELECT 0, COUNT(*), COALESCE(SUM(age), 0), "
+            "COALESCE(SUM(age * age), 0) FROM user_data"
+        )
+        cursor.execute(
+            "INSERT INTO user_age_histogram (age, shard, row_count) "
+            "SELECT age, 0, COUNT(*) FROM user_data GROUP BY age"
+        )
+        connection.commit()
+    finally:
+        cursor.execute("UNLOCK TABLES")
+        cursor.close()
+
+
+# Change counter of user_data: every inserted, updated or deleted row adds
+# one to the shard of the writing connection, so the sum over the shards
+# only ever grows and works as a version of the table contents
+CHANGE_COUNTER_TABLE = """
+    CREATE TABLE IF NOT EXISTS user_data_changes (
+        shard TINYINT PRIMARY KEY,
+        changes BIGINT NOT NULL
+    );
+    """
+
+_COUNT_CHANGE = f"""
+        INSERT INTO user_data_changes (shard, changes)
+        VALUES (CONNECTION_ID() % {AGE_AGGREGATE_SHARDS}, 1)
+        ON DUPLICATE KEY UPDATE changes = changes + 1;"""
+
+CHANGE_COUNTER_TRIGGERS = {
+    f"user_data_change_{event.lower()}": f"""
+    CREATE TRIGGER user_data_change_{event.lower()} AFTER {event}
+    ON user_data FOR EACH ROW BEGIN{_COUNT_CHANGE}
+    END
+    """
+    for event in ("INSERT", "UPDATE", "DELETE")
+}
+
+
+def create_change_counter(connection):
+    """
+    Count every change to user_data in user_data_changes.
+
+    The table is never dropped and only missing triggers are created, so
+    the version read by change_version() never goes back or skips a
+    change.
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.execute(CHANGE_COUNTER_TABLE)
+        cursor.execute(
+            "SELECT trigger_name FROM information_schema.triggers "
+            "WHERE trigger_schema = DATABASE() "
+            "AND event_object_table = 'user_data'"
+        )
+        existing = {name for (name,) in cursor.fetchall()}
+        for name, trigger_query in CHANGE_COUNTER_TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(trigger_query)
+        connection.commit()
+        print("Change counter on user_data created successfully")
+    except mysql.connector.Error as err:
+        print(f"Error creating change counter: {err}")
+    finally:
+        cursor.close()
+
+
+def change_version(connection):
+    """
+    Current version of user_data from the change counter.
+
+    Returns:
+        int: Number of row changes counted so far, or None when
+        create_change_counter() has not been run.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT COALESCE(SUM(changes), 0) FROM user_data_changes"
+        )
+        return int(cursor.fetchone()[0])
+    except mysql.connector.Error:
+        return None
+    finally:
+        cursor.close()
+
+
+def insert_data(connection, csv_file, dedupe=True, chunk_size=1000):
+    """
+    Insert data from CSV into user_data table if not exists
+
+    With dedupe, emails are checked with one SELECT ... IN per chunk of
+    rows instead of one SELECT per row. When the file is large compared
+    to the table, a Bloom filter of the stored emails is built first so
+    emails it rules out skip the lookup.
+    """
+    if dedupe:
+        insert_data_deduped(connection, csv_file, chunk_size)
+        return
     try:
         cursor = connection.cursor()
         with open(csv_file, newline="", encoding="utf-8") as file:
@@ -98,3 +319,462 @@ def insert_data(connection, csv_file):
         print(f"Error inserting data: {e}")
     finally:
         cursor.close()
+
+
+def insert_data_deduped(connection, csv_file, chunk_size=1000,
+                        filter_ratio=2):
+    """
+    Insert CSV rows whose email is not stored yet, see insert_data().
+
+    Building the Bloom filter streams every stored email to the client,
+    so it is only done when the table holds at most filter_ratio times
+    as many rows as the file; otherwise the batched lookups are cheaper.
+    """
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        file_rows = _count_lines(csv_file)
+        seen = None
+        if _estimated_rows(cursor) <= filter_ratio * file_rows:
+            seen = load_email_filter(connection, file_rows)
+        with open(csv_file, newline="", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            chunk = []
+            for row in reader:
+                chunk.append((row["name"], row["email"], row["age"]))
+                if len(chunk) == chunk_size:
+                    _insert_new_emails(cursor, chunk, seen)
+                    chunk = []
+            if chunk:
+                _insert_new_emails(cursor, chunk, seen)
+        connection.commit()
+        print("Data inserted successfully")
+    except Exception as e:
+        print(f"Error inserting data: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+
+
+def _insert_new_emails(cursor, chunk, seen):
+    """
+    Insert the (name, email, age) rows of a chunk whose email is new.
+
+    Only emails the Bloom filter cannot rule out are looked up, all in a
+    single query; without a filter (seen is None) every email is.
+    """
+    maybe = list({email for _, email, _ in chunk
+                  if seen is None or email.lower() in seen})
+    existing = set()
+    if maybe:
+        placeholders = ", ".join(["%s"] * len(maybe))
+        cursor.execute(
+            f"SELECT email FROM user_data WHERE email IN ({placeholders})",
+            maybe,
+        )
+        existing = {email.lower() for (email,) in cursor.fetchall()}
+
+    new_rows = []
+    for name, email, age in chunk:
+        key = email.lower()
+        if key in existing:
+            continue
+        existing.add(key)  # later duplicates within the chunk
+        if seen is not None:
+            seen.add(key)
+        new_rows.append((str(uuid.uuid4()), name, email, age))
+    if new_rows:
+        cursor.executemany(
+            "INSERT INTO user_data (user_id, name, email, age) "
+            "VALUES (%s, %s, %s, %s)",
+            new_rows,
+        )
+
+
+class BloomFilter:
+    """
+    Set membership test with no false negatives and a bounded rate of
+    false positives, in about 10 bits per item at a 1% error rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate)
+                               / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        """Bit positions of an item, by double hashing one blake2b digest"""
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * step) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        """Add an item to the filter"""
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+def load_email_filter(connection, expected_new=0, batch_size=10000):
+    """
+    Build a Bloom filter of the lower-cased emails already in user_data.
+
+    Emails are lower-cased because the default MySQL collation compares
+    them case-insensitively.
+
+    Args:
+        connection: Connection to the ALX_prodev database.
+        expected_new (int): Emails that will be added on top, so the
+            filter is sized for them too.
+        batch_size (int): Emails fetched per round trip.
+
+    Returns:
+        BloomFilter: Filter holding every existing email.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        emails = BloomFilter(cursor.fetchone()[0] + expected_new)
+        cursor.execute("SELECT email FROM user_data")
+        rows = cursor.fetchmany(batch_size)
+        while rows:
+            for (email,) in rows:
+                emails.add(email.lower())
+            rows = cursor.fetchmany(batch_size)
+        return emails
+    finally:
+        cursor.close()
+
+
+def _estimated_rows(cursor):
+    """Row count of user_data from table statistics, without a scan"""
+    cursor.execute(
+        "SELECT COALESCE(MAX(table_rows), 0) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = 'user_data'"
+    )
+    return int(cursor.fetchone()[0])
+
+
+def _count_lines(path):
+    """Number of lines in a file, read in binary blocks"""
+    with open(path, "rb") as file:
+        return sum(block.count(b"\n")
+                   for block in iter(lambda: file.read(1 << 20), b""))
+
+
+def create_email_index(connection):
+    """
+    Add the unique email index to a user_data table created without it.
+
+    Returns:
+        bool: True when the index is in place; adding it fails while
+        the table holds duplicate emails.
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'user_data' "
+            "AND index_name = 'uq_user_data_email'"
+        )
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(
+                "ALTER TABLE user_data "
+                "ADD UNIQUE INDEX uq_user_data_email (email)"
+            )
+        print("Unique email index on user_data is in place")
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error creating email index: {err}")
+        return False
+    finally:
+        cursor.close()
+
+
+def upsert_users(cursor, rows):
+    """
+    Insert (user_id, name, email, age) rows with one multi-row statement.
+
+    Rows whose email already exists update name and age in place and keep
+    their user_id, so loading the same file twice changes nothing.
+    """
+    placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+    cursor.execute(
+        "INSERT INTO user_data (user_id, name, email, age) "
+        f"VALUES {placeholders} "
+        "ON DUPLICATE KEY UPDATE name = VALUES(name), age = VALUES(age)",
+        [value for row in rows for value in row],
+    )
+
+
+def insert_data_bulk(connection, csv_file, chunk_size=1000,
+                     commit_every=50000, report_every=100000):
+    """
+    Load a CSV into user_data with chunked, idempotent multi-row upserts.
+
+    Relies on the unique email index instead of checking every email
+    with its own SELECT. The index is added first when missing (see
+    create_email_index); without it the upserts would duplicate every
+    row on a re-run, so nothing is loaded.
+
+    Args:
+        connection: Connection to the ALX_prodev database.
+        csv_file (str): Path of a CSV file with name, email and age columns.
+        chunk_size (int): Rows sent per INSERT statement.
+        commit_every (int): Rows written between commits.
+        report_every (int): Rows between progress lines, 0 to disable.
+
+    Returns:
+        int: Number of CSV rows processed.
+    """
+    if not create_email_index(connection):
+        print("Error inserting data: unique email index is missing")
+        return 0
+    cursor = None
+    total = 0
+    uncommitted = 0
+    started = time.perf_counter()
+    try:
+        cursor = connection.cursor()
+        with open(csv_file, newline="", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            chunk = []
+            for row in reader:
+                chunk.append(
+                    (str(uuid.uuid4()), row["name"], row["email"], row["age"])
+                )
+                if len(chunk) < chunk_size:
+                    continue
+                upsert_users(cursor, chunk)
+                total += len(chunk)
+                uncommitted += len(chunk)
+                if report_every and total % report_every < len(chunk):
+                    _report_progress(total, started)
+                chunk = []
+                if uncommitted >= commit_every:
+                    connection.commit()
+                    uncommitted = 0
+            if chunk:
+                upsert_users(cursor, chunk)
+                total += len(chunk)
+        connection.commit()
+        _report_progress(total, started)
+        print("Data inserted successfully")
+    except Exception as e:
+        connection.rollback()
+        print(f"Error inserting data: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+    return total
+
+
+def _report_progress(total, started):
+    """Print rows loaded so far and the load rate"""
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"{total} rows loaded in {elapsed:.1f}s ({rate:.0f} rows/s)")
+
+
+def csv_byte_ranges(csv_file, chunk_bytes):
+    """
+    Split the body of a CSV file into byte ranges that end on a newline.
+
+    Assumes no quoted field spans several lines.
+
+    Yields:
+        tuple: (start, end) byte offsets of each chunk.
+    """
+    size = os.path.getsize(csv_file)
+    with open(csv_file, "rb") as file:
+        file.readline()  # header
+        start = file.tell()
+        while start < size:
+            file.seek(min(start + chunk_bytes, size))
+            file.readline()
+            end = file.tell()
+            yield start, end
+            start = end
+
+
+def parse_csv_chunk(csv_file, start, end, fieldnames, batch_size):
+    """
+    Parse and validate one byte range of the CSV into insert batches.
+
+    Rows without a name, with an email lacking "@" or with an age that is
+    not a finite number are skipped.
+
+    Returns:
+        tuple: (list of batches of (user_id, name, email, age) rows,
+        number of rows rejected).
+    """
+    with open(csv_file, "rb") as file:
+        file.seek(start)
+        text = file.read(end - start).decode("utf-8")
+    batches, batch, rejected = [], [], 0
+    for row in csv.DictReader(io.StringIO(text, newline=""), fieldnames):
+        name = (row.get("name") or "").strip()
+        email = (row.get("email") or "").strip()
+        age = (row.get("age") or "").strip()
+        try:
+            if not Decimal(age).is_finite():  # "nan" and "inf" parse
+                age = ""
+        except InvalidOperation:
+            age = ""
+        if not name or "@" not in email or not age:
+            rejected += 1
+            continue
+        batch.append((str(uuid.uuid4()), name, email, age))
+        if len(batch) == batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    return batches, rejected
+
+
+# lock conflicts between concurrent upserts on the unique email index;
+# the statement is rolled back and can simply run again
+_RETRYABLE_ERRORS = (errorcode.ER_LOCK_DEADLOCK,
+                     errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+
+def upsert_users_retrying(connection, cursor, rows, attempts=5, delay=0.05):
+    """
+    Upsert and commit one batch, retrying deadlocks and lock wait timeouts.
+
+    Retries back off exponentially with jitter; any other error, or the
+    last failed attempt, is raised.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            upsert_users(cursor, rows)
+            connection.commit()
+            return
+        except mysql.connector.Error as err:
+            try:
+                connection.rollback()
+            except mysql.connector.Error:
+                raise err  # connection is gone; report the original error
+            if err.errno not in _RETRYABLE_ERRORS or attempt == attempts:
+                raise
+            time.sleep(random.uniform(0, delay * 2 ** (attempt - 1)))
+
+
+def parallel_insert_data(csv_file, workers=None, writers=4,
+                         chunk_bytes=4 * 1024 * 1024, batch_size=1000,
+                         queue_size=16):
+    """
+    Load a CSV into user_data with parallel parsing and several writers.
+
+    The file is cut into byte ranges that a process pool parses and
+    validates into insert batches. Batches go through a bounded queue to
+    writer threads, each with its own connection, that upsert them (see
+    upsert_users_retrying). Deadlocks and lock wait timeouts between
+    writers are retried; any other error stops the load. At most
+    2 * workers parsed chunks plus queue_size batches are held in memory
+    at once.
+
+    As with insert_data_bulk(), the unique email index is added first
+    and nothing is loaded without it.
+
+    Args:
+        csv_file (str): Path of a CSV file with name, email and age columns.
+        workers (int): Parser processes, the CPU count when None.
+        writers (int): Writer threads and connections.
+        chunk_bytes (int): Approximate size of each parsed byte range.
+        batch_size (int): Rows per INSERT statement and commit.
+        queue_size (int): Batches waiting for a writer.
+
+    Returns:
+        int: Number of rows written.
+    """
+    connection = connect_to_prodev()
+    if connection is None:
+        return 0
+    try:
+        indexed = create_email_index(connection)
+    finally:
+        connection.close()
+    if not indexed:
+        print("Error inserting data: unique email index is missing")
+        return 0
+
+    with open(csv_file, newline="", encoding="utf-8") as file:
+        fieldnames = next(csv.reader(file))
+    workers = workers or os.cpu_count() or 1
+    batches = queue.Queue(maxsize=queue_size)
+    failed = threading.Event()
+    errors = []
+    lock = threading.Lock()
+    progress = {"written": 0, "rejected": 0}
+    started = time.perf_counter()
+
+    def write():
+        connection = connect_to_prodev()
+        cursor = connection.cursor() if connection else None
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                if failed.is_set():
+                    continue  # drain so the reader never blocks
+                try:
+                    upsert_users_retrying(connection, cursor, batch)
+                except Exception as e:
+                    errors.append(e)
+                    failed.set()
+                    continue
+                with lock:
+                    progress["written"] += len(batch)
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    threads = [threading.Thread(target=write) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            ranges = csv_byte_ranges(csv_file, chunk_bytes)
+            while not failed.is_set():
+                for start, end in ranges:
+                    pending.add(pool.submit(parse_csv_chunk, csv_file, start,
+                                            end, fieldnames, batch_size))
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_batches, rejected = future.result()
+                    progress["rejected"] += rejected
+                    for batch in chunk_batches:
+                        batches.put(batch)
+                with lock:
+                    _report_progress(progress["written"], started)
+            for future in pending:
+                future.cancel()
+    finally:
+        for _ in threads:
+            batches.put(None)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        print(f"Error inserting data: {errors[0]}")
+    else:
+        _report_progress(progress["written"], started)
+        print(f"Data inserted successfully, {progress['rejected']} "
+              "invalid rows skipped")
+    return progress["written"]
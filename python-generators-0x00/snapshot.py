@@ -0,0 +1,284 @@
+#!/usr/bin/python3
+"""
+Memory-mapped local snapshot of the user_data table.
+
+export_snapshot() writes the table once into a fixed-width columnar file:
+
+    header | age int32 * n | user_id 36B * n | name wB * n | email wB * n
+
+Snapshot maps that file with mmap, so repeated scans read straight from
+the page cache without touching MySQL, and column() hands out zero-copy
+memoryviews. The version of the source table (seed.change_version()) and
+a per-row fingerprint are stored in the header, so is_stale() can tell
+whether the snapshot still matches the database.
+"""
+
+import mmap
+import os
+import struct
+import time
+
+import seed
+
+MAGIC = b"USERSNP1"
+# magic, rows, name width, email width, row fingerprint, created at,
+# table version (-1 without a change counter)
+HEADER = struct.Struct("<8sQHHQdq")
+HEADER_SIZE = 64
+USER_ID_WIDTH = 36
+AGE_WIDTH = 4
+
+
+def source_fingerprint(connection):
+    """
+    Summarise the current contents of user_data.
+
+    Returns:
+        tuple: (row count, XOR of a CRC32 per row).
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', "
+            "user_id, name, email, age))), 0) FROM user_data"
+        )
+        count, checksum = cursor.fetchone()
+        return int(count), int(checksum)
+    finally:
+        cursor.close()
+
+
+def _layout(count, name_width, email_width):
+    """Byte offset of every column section and the total file size"""
+    offsets = {"age": HEADER_SIZE}
+    offsets["user_id"] = offsets["age"] + count * AGE_WIDTH
+    offsets["name"] = offsets["user_id"] + count * USER_ID_WIDTH
+    offsets["email"] = offsets["name"] + count * name_width
+    return offsets, offsets["email"] + count * email_width
+
+
+def export_snapshot(path, batch_size=10000):
+    """
+    Export user_data into a snapshot file at path.
+
+    The table is read inside one consistent-snapshot transaction, so the
+    stored fingerprint matches the exported rows. The file is written
+    next to path and renamed into place, so readers never see a partial
+    snapshot.
+
+    Args:
+        path (str): Destination file.
+        batch_size (int): Rows fetched per round trip.
+
+    Returns:
+        int: Number of rows exported.
+    """
+    connection = seed.connect_to_prodev()
+    temporary = f"{path}.tmp"
+    try:
+        connection.start_transaction(consistent_snapshot=True, readonly=True)
+        count, checksum = source_fingerprint(connection)
+        version = seed.change_version(connection)
+        cursor = connection.cursor()
+        # slots hold UTF-8, whatever the charset of the table
+        cursor.execute(
+            "SELECT COALESCE(MAX(LENGTH(CONVERT(name USING utf8mb4))), 1), "
+            "COALESCE(MAX(LENGTH(CONVERT(email USING utf8mb4))), 1) "
+            "FROM user_data"
+        )
+        name_width, email_width = (int(width) for width in cursor.fetchone())
+        cursor.close()
+
+        offsets, size = _layout(count, name_width, email_width)
+        widths = {"name": name_width, "email": email_width}
+        with open(temporary, "w+b") as file:
+            file.truncate(size)
+            with mmap.mmap(file.fileno(), size) as target:
+                target[:HEADER.size] = HEADER.pack(
+                    MAGIC, count, name_width, email_width, checksum,
+                    time.time(), -1 if version is None else version,
+                )
+                ages = memoryview(target)[
+                    offsets["age"]:offsets["user_id"]
+                ].cast("i")
+                try:
+                    _write_rows(connection, target, ages, offsets, widths,
+                                batch_size)
+                finally:
+                    ages.release()
+                target.flush()
+        connection.rollback()
+        os.replace(temporary, path)
+        return count
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        connection.close()
+
+
+def _write_rows(connection, target, ages, offsets, widths, batch_size):
+    """Stream user_data in user_id order into the mapped snapshot file"""
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(
+            "SELECT user_id, name, email, age FROM user_data "
+            "ORDER BY user_id"
+        )
+        index = 0
+        rows = cursor.fetchmany(batch_size)
+        while rows:
+            for user_id, name, email, age in rows:
+                ages[index] = int(age)
+                start = offsets["user_id"] + index * USER_ID_WIDTH
+                target[start:start + USER_ID_WIDTH] = (
+                    user_id.encode("ascii").ljust(USER_ID_WIDTH)
+                )
+                for column, value in (("name", name), ("email", email)):
+                    width = widths[column]
+                    start = offsets[column] + index * width
+                    target[start:start + width] = (
+                        value.encode("utf-8").ljust(width, b"\0")
+                    )
+                index += 1
+            rows = cursor.fetchmany(batch_size)
+    finally:
+        cursor.close()
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Memoryviews returned by column() point into the mapping and must be
+    released before close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.count, name_width, email_width, self.checksum,
+         self.created_at, self.version) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a user_data snapshot")
+        self.widths = {
+            "age": AGE_WIDTH,
+            "user_id": USER_ID_WIDTH,
+            "name": name_width,
+            "email": email_width,
+        }
+        self._offsets, _ = _layout(self.count, name_width, email_width)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unmap the snapshot file"""
+        self._map.close()
+
+    def column(self, name):
+        """
+        Zero-copy view of one column.
+
+        Returns:
+            memoryview: int32 items for age; for the text columns, the raw
+            bytes of count fixed-width slots of self.widths[name] bytes.
+        """
+        if name not in self.widths:
+            raise ValueError(f"Unknown user_data column: {name}")
+        start = self._offsets[name]
+        end = start + self.count * self.widths[name]
+        view = memoryview(self._map)[start:end]
+        return view.cast("i") if name == "age" else view
+
+    def value(self, name, index):
+        """Decoded value of one column for the row at index"""
+        if name == "age":
+            with self.column("age") as ages:
+                return ages[index]
+        return self._text(name, index)
+
+    def _text(self, name, index):
+        """Decode one fixed-width text slot"""
+        width = self.widths[name]
+        start = self._offsets[name] + index * width
+        raw = self._map[start:start + width]
+        if name == "user_id":
+            return raw.decode("ascii")
+        return raw.rstrip(b"\0").decode("utf-8")
+
+    def rows(self):
+        """
+        Generator that streams the snapshot like stream_users(), in
+        user_id order.
+
+        Yields:
+            dict: A row with keys user_id, name, email, age.
+        """
+        ages = self.column("age")
+        try:
+            for index in range(self.count):
+                yield {
+                    "user_id": self._text("user_id", index),
+                    "name": self._text("name", index),
+                    "email": self._text("email", index),
+                    "age": ages[index],
+                }
+        finally:
+            ages.release()
+
+    def is_stale(self, max_age=None, deep=False):
+        """
+        Tell whether the snapshot no longer matches user_data.
+
+        The table version from seed.change_version() is compared, a
+        lookup of a few rows that catches every insert, update and
+        delete. Without a change counter the per-row CRC fingerprint is
+        compared instead, which hashes every row of user_data on the
+        server.
+
+        Args:
+            max_age (float): Trust snapshots younger than this many
+                seconds without asking the database.
+            deep (bool): Always compare the CRC fingerprint.
+
+        Returns:
+            bool: True when the snapshot should be exported again.
+        """
+        if max_age is not None and time.time() - self.created_at < max_age:
+            return False
+        connection = seed.connect_to_prodev()
+        try:
+            if not deep and self.version >= 0:
+                version = seed.change_version(connection)
+                if version is not None:
+                    return version != self.version
+            return source_fingerprint(connection) != (self.count,
+                                                      self.checksum)
+        finally:
+            connection.close()
+
+
+def load_snapshot(path, max_age=None, deep=False):
+    """
+    Open the snapshot at path, exporting it first when missing or stale.
+
+    max_age and deep are passed to Snapshot.is_stale().
+
+    Returns:
+        Snapshot: The mapped snapshot.
+    """
+    if os.path.exists(path):
+        current = Snapshot(path)
+        if not current.is_stale(max_age, deep):
+            return current
+        current.close()
+    export_snapshot(path)
+    return Snapshot(path)
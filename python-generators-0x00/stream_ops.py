@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+"""
+Lazy, composable operators over the user_data generators.
+
+    over_25 = (Stream(stream_users())
+               .filter(lambda user: user["age"] > 25)
+               .batch(100))
+
+Every operator wraps the previous iterator without reading ahead, so rows
+are only pulled from the database as the end of the pipeline asks for
+them. parallel_map() keeps a bounded number of items in flight, so a slow
+consumer or slow workers hold the source back instead of letting work
+pile up in memory.
+"""
+
+from collections import deque
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from itertools import islice, tee
+
+
+class Stream:
+    """Chainable wrapper around any iterable"""
+
+    def __init__(self, source):
+        self._source = iter(source)
+
+    def __iter__(self):
+        return self._source
+
+    def map(self, func):
+        """Apply func to every item"""
+        return Stream(map(func, self._source))
+
+    def filter(self, predicate):
+        """Keep the items for which predicate is true"""
+        return Stream(filter(predicate, self._source))
+
+    def batch(self, size):
+        """Group items into lists of size items, the last may be shorter"""
+        return Stream(_batches(self._source, size))
+
+    def window(self, size, step=1):
+        """Sliding windows of size items as tuples, advancing by step"""
+        return Stream(_windows(self._source, size, step))
+
+    def take(self, count):
+        """Stop after count items"""
+        return Stream(islice(self._source, count))
+
+    def tee(self, count=2):
+        """
+        Split into count independent streams.
+
+        Items one branch has read but another has not are buffered, so
+        the branches should be consumed at a similar pace.
+        """
+        return tuple(Stream(branch) for branch in tee(self._source, count))
+
+    def parallel_map(self, func, workers=4, processes=False, ordered=True,
+                     max_pending=None):
+        """
+        Apply func to every item on a pool of workers.
+
+        Args:
+            func (callable): Function to apply; must be picklable when
+                processes is True.
+            workers (int): Size of the worker pool.
+            processes (bool): Use processes instead of threads, for
+                CPU-heavy functions.
+            ordered (bool): Keep the source order; otherwise results are
+                yielded as soon as they are ready.
+            max_pending (int): Items submitted but not yet yielded,
+                2 * workers when None.
+        """
+        return Stream(_parallel_map(self._source, func, workers, processes,
+                                    ordered, max_pending or 2 * workers))
+
+    def collect(self):
+        """Read the whole stream into a list"""
+        return list(self._source)
+
+
+def _batches(items, size):
+    """Generator of lists of up to size consecutive items"""
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _windows(items, size, step):
+    """Generator of sliding windows over items"""
+    window = deque(islice(items, size), maxlen=size)
+    if len(window) < size:
+        return
+    while True:
+        yield tuple(window)
+        added = 0
+        for item in islice(items, step):
+            window.append(item)
+            added += 1
+        if added < step:
+            return
+
+
+def _parallel_map(items, func, workers, processes, ordered, max_pending):
+    """Generator behind Stream.parallel_map()"""
+    pool_type = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    pool = pool_type(max_workers=workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) < max_pending:
+                continue
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    stream_users = __import__("0-stream_users").stream_users
+    for batch in (Stream(stream_users(unbuffered=True))
+                  .filter(lambda user: user["age"] > 25)
+                  .batch(5)
+                  .take(2)):
+        print(batch)